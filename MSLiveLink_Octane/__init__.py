@@ -18,12 +18,23 @@ import threading
 import os
 import time
 import json
+import hashlib
 import socket, errno
+import atexit
+import collections
+import selectors
+import re
+import struct
+import csv
+import sys
+import argparse
+import subprocess
+import shutil
+import concurrent.futures
 from bpy.types import Operator, AddonPreferences
-from bpy.props import IntProperty, EnumProperty, BoolProperty
+from bpy.props import IntProperty, EnumProperty, BoolProperty, StringProperty
 
-globals()['Megascans_DataSet'] = None
-globals()['MG_Material'] = []
+globals()['MG_Material'] = {}
 globals()['MG_AlembicPath'] = []
 globals()['MG_ImportComplete'] = False
 
@@ -109,6 +120,146 @@ class MSLiveLinkPrefs(AddonPreferences):
         default=False
     )
 
+    reuse_materials: BoolProperty(
+        name="Reuse materials",
+        description="Reuse the material of a previous import of the same asset made with the same settings",
+        default=True
+    )
+
+    prefetch_textures: BoolProperty(
+        name="Prefetch textures",
+        description="Read texture files in the background as soon as Bridge sends an asset",
+        default=True
+    )
+
+    hash_textures: BoolProperty(
+        name="Match textures by content",
+        description="Reuse already loaded images whose file content is identical, even when stored at a different path",
+        default=False
+    )
+
+    max_texture_resolution: EnumProperty(
+        items=[
+            ('0', 'Full', 'Load textures at their full resolution'),
+            ('4096', '4K', 'Use proxies of textures larger than 4096 pixels'),
+            ('2048', '2K', 'Use proxies of textures larger than 2048 pixels'),
+            ('1024', '1K', 'Use proxies of textures larger than 1024 pixels'),
+            ('512', '512', 'Use proxies of textures larger than 512 pixels')
+        ],
+        name="Max texture resolution",
+        description="Load downscaled proxies of large textures for look development. Maps that are not connected to the material are skipped",
+        default='0'
+    )
+
+    scatter_mode: EnumProperty(
+        items=[
+            ('PARENT', 'Parent to empty', 'Parent the variations of scatter assets to an empty'),
+            ('COLLECTION', 'Collection instance', 'Move the variations of scatter assets into a collection instanced by an empty, for use with particle or geometry nodes distribution')
+        ],
+        name="Scatter setup",
+        description="How the variations of scatter assets are set up",
+        default='PARENT'
+    )
+
+    instance_repeated_meshes: BoolProperty(
+        name="Instance repeated meshes",
+        description="Create linked duplicates sharing the mesh data of a previous import of the same files instead of importing them again",
+        default=True
+    )
+
+    import_all_lods: BoolProperty(
+        name="Import all LODs",
+        description="Import every LOD file found next to the exported mesh into one collection",
+        default=False
+    )
+
+    prefer_highest_resolution: BoolProperty(
+        name="Prefer highest resolution",
+        description="Use the highest resolution of each texture found in the asset folder instead of the one exported by Bridge",
+        default=False
+    )
+
+    import_queue_size: IntProperty(
+        name="Import queue size",
+        description="Number of Bridge exports that can wait to be imported before LiveLink stops receiving",
+        min=1,
+        max=1024,
+        default=32
+    )
+
+    coalesce_imports: BoolProperty(
+        name="Coalesce queued imports",
+        description="Import every waiting Bridge export in a single pass",
+        default=False
+    )
+
+    import_time_budget: IntProperty(
+        name="Import time budget (ms)",
+        description="Time spent importing before the interface gets to redraw. Takes effect the next time LiveLink is started",
+        min=1,
+        max=1000,
+        default=50
+    )
+
+    stream_assets: BoolProperty(
+        name="Stream assets",
+        description="Start importing each asset as soon as it is received instead of waiting for the whole export. Takes effect the next time LiveLink is started",
+        default=True
+    )
+
+    recv_buffer_size: IntProperty(
+        name="Receive buffer (KB)",
+        description="Size of each socket read from Bridge. Takes effect the next time LiveLink is started",
+        min=4,
+        max=4096,
+        default=8
+    )
+
+    use_material_templates: BoolProperty(
+        name="Material templates",
+        description="Copy the node setup of a previously built material with the same maps and settings, and only swap its images",
+        default=True
+    )
+
+    convert_textures: BoolProperty(
+        name="Convert textures",
+        description="Convert textures into tiled, mip-mapped files (half-float EXR for displacement, 8-bit TIFF otherwise) stored next to the asset. Needs OpenImageIO's maketx",
+        default=False
+    )
+
+    conversion_cache_dir: StringProperty(
+        name="Conversion cache",
+        description="Shared folder for the converted textures, in a .mslivelink_textures subfolder, whose least recently used files are deleted once it is larger than its size limit. Textures are stored next to the asset when empty",
+        subtype='DIR_PATH',
+        default=""
+    )
+
+    conversion_cache_size: IntProperty(
+        name="Conversion cache size (GB)",
+        description="Least recently used converted textures in the conversion cache folder are deleted once it is larger. Textures used by the open file are kept",
+        min=1,
+        max=10000,
+        default=20
+    )
+
+    pack_channels: BoolProperty(
+        name="Pack single channel maps",
+        description="Pack roughness, metalness, AO, opacity, cavity and curvature into RGBA images cached next to the asset. Needs Octane's channel picker node",
+        default=False
+    )
+
+    lazy_materials: BoolProperty(
+        name="Lazy materials",
+        description="Import placeholder materials whose node setup and textures are only loaded once they are visible in a rendered viewport or realized from the import menu",
+        default=False
+    )
+
+    collect_telemetry: BoolProperty(
+        name="Collect import telemetry",
+        description="Record the time spent in every phase of the import, summarized below and exportable as a Chrome trace or CSV",
+        default=True
+    )
+
     def draw(self, context):
         layout = self.layout
         col = layout.column()
@@ -123,107 +274,271 @@ class MSLiveLinkPrefs(AddonPreferences):
         col.prop(self, "is_curvature_enabled")
         col.prop(self, "is_bump_enabled")
         col.prop(self, "is_fuze_enabled")
+        col.prop(self, "reuse_materials")
+        col.prop(self, "lazy_materials")
+        col.prop(self, "use_material_templates")
+        col.prop(self, "pack_channels")
+        col.prop(self, "convert_textures")
+        if self.convert_textures:
+            col.prop(self, "conversion_cache_dir")
+            col.prop(self, "conversion_cache_size")
+        col.prop(self, "prefetch_textures")
+        col.prop(self, "hash_textures")
+        col.prop(self, "prefer_highest_resolution")
+        col.prop(self, "import_all_lods")
+        col.prop(self, "instance_repeated_meshes")
+        col.prop(self, "scatter_mode")
+        col.prop(self, "max_texture_resolution")
+        col.prop(self, "import_queue_size")
+        col.prop(self, "coalesce_imports")
+        stats = globals()['MG_ImportQueue'].Stats()
+        col.label(text="Import queue: %d pending, %d received, %d imported, %d dropped" % (
+            stats["pending"], stats["enqueued"], stats["processed"], stats["dropped"]))
+        col.prop(self, "import_time_budget")
+        col.prop(self, "stream_assets")
+        col.prop(self, "recv_buffer_size")
+
+        # Timing of the most recent import phases.
+        box = layout.box()
+        box.prop(self, "collect_telemetry")
+        summary = globals()['MG_Telemetry'].Summary()
+        if summary:
+            row = box.row()
+            for heading in ("Phase", "Count", "p50 (ms)", "p95 (ms)", "Total (ms)"):
+                row.label(text=heading)
+            for phase, stats in sorted(summary.items()):
+                row = box.row()
+                row.label(text=phase)
+                row.label(text="%d" % stats["count"])
+                row.label(text="%.2f" % (stats["p50"] * 1000))
+                row.label(text="%.2f" % (stats["p95"] * 1000))
+                row.label(text="%.1f" % (stats["total"] * 1000))
+        row = box.row()
+        row.operator(MS_Export_Telemetry.bl_idname, text="Export Chrome Trace").file_format = 'CHROME'
+        row.operator(MS_Export_Telemetry.bl_idname, text="Export CSV").file_format = 'CSV'
+        row.operator(MS_Clear_Telemetry.bl_idname, text="Clear")
 
 class MS_Init_ImportProcess():
 
-    def __init__(self):
+    # Number of resumable steps for every asset: parse, geometry, material and link.
+    stepsPerAsset = 4
+
+    def __init__(self, payloads):
         # This initialization method create the data structure to process our assets
-        # later on in the initImportProcess method. The method loops on all assets
-        # that have been sent by Bridge.
+        # later on in the initImportProcess method. The import itself is split into
+        # resumable steps (parse, geometry, material, link) run by MS_ImportScheduler,
+        # so large batches from Bridge don't freeze the interface.
 
         print("Initialized import class...")
+        self.InitState(payloads)
+        # Folder listings are revalidated once per import job.
+        globals()['MG_DirectoryIndex'].NewBatch()
         try:
-            # Check if there's any incoming data
-            if globals()['Megascans_DataSet'] != None:
-                self.json_Array = json.loads(globals()['Megascans_DataSet'])
-
-                # Start looping over each asset in the self.json_Array list
-                for js in self.json_Array:
-                    self.json_data = js
-                    self.selectedObjects = []
-                    self.assetType = self.json_data["type"]
-                    self.assetPath = self.json_data["path"]
-                    self.assetID = self.json_data["id"]
-                    # Workflow setup
-                    self.isMetal = bool(self.json_data["category"] == "Metal")
-                    self.isHighPoly = bool(
-                        self.json_data["activeLOD"] == "high")
-                    self.activeLOD = self.json_data["activeLOD"]
-                    self.minLOD = self.json_data["minLOD"]
-                    self.isScatterAsset = self.CheckScatterAsset()
-                    self.textureList = []
-                    self.isBillboard = self.CheckIsBillboard()
-                    self.ApplyToSelection = False
-                    self.isAlembic = False
-
-                    if "applyToSelection" in self.json_data.keys():
-                        self.ApplyToSelection = bool(
-                            self.json_data["applyToSelection"])
-
-                    texturesListName = "components"
-                    if(self.isBillboard):
-                        texturesListName = "components"
-
-                    self.textureTypes = [obj["type"]
-                                         for obj in self.json_data[texturesListName]]
-                    self.textureList = []
-
-                    for obj in self.json_data[texturesListName]:
-                        texFormat = obj["format"]
-                        texType = obj["type"]
-                        texPath = obj["path"]
-
-                        if texType == "displacement" and texFormat != "exr":
-                            texDir = os.path.dirname(texPath)
-                            texName = os.path.splitext(
-                                os.path.basename(texPath))[0]
-
-                            if os.path.exists(os.path.join(texDir, texName + ".exr")):
-                                texPath = os.path.join(
-                                    texDir, texName + ".exr")
-                                texFormat = "exr"
-                        # Replace diffuse texture type with albedo so we don't have to add more conditions to handle diffuse map.
-                        if texType == "diffuse" and "albedo" not in self.textureTypes:
-                            texType = "albedo"
-                            self.textureTypes.append("albedo")
-                            self.textureTypes.remove("diffuse")
-
-                        self.textureList.append((texFormat, texType, texPath))
-
-                    # Create a tuple list of all the 3d meshes  available.
-                    # This tuple is composed of (meshFormat, meshPath)
-                    self.geometryList = [(obj["format"], obj["path"])
-                                         for obj in self.json_data["meshList"]]
-
-                    # Create name of our asset. Multiple conditions are set here
-                    # in order to make sure the asset actually has a name and that the name
-                    # is short enough for us to use it. We compose a name with the ID otherwise.
-                    if "name" in self.json_data.keys():
-                        self.assetName = self.json_data["name"].replace(
-                            " ", "_")
-                    else:
-                        self.assetName = os.path.basename(
-                            self.json_data["path"]).replace(" ", "_")
-                    if len(self.assetName.split("_")) > 2:
-                        self.assetName = "_".join(
-                            self.assetName.split("_")[:-1])
-
-                    self.materialName = self.assetName + '_' + self.assetID
-                    self.colorSpaces = ["sRGB", "Non-Color"]
-
-                    # Initialize the import method to start building our shader and import our geometry
-                    self.initImportProcess()
-                    print("Imported asset from " +
-                          self.assetName + " Quixel Bridge")
-
-            if len(globals()['MG_AlembicPath']) > 0:
-                globals()['MG_ImportComplete'] = True
+            # Decode the incoming payloads, oldest first. Streamed payloads are already lists of assets.
+            decodeStart = time.perf_counter()
+            for payload in payloads:
+                if isinstance(payload, list):
+                    self.assetList += payload
+                else:
+                    self.assetList += json.loads(payload)
+            self.phaseTimes["decode"] += time.perf_counter() - decodeStart
+
+            prefs = bpy.context.preferences.addons[__name__].preferences
+            self.ReadPrefs(prefs)
+            globals()['MG_Telemetry'].Record("decode", decodeStart, time.perf_counter() - decodeStart)
         except Exception as e:
             print(
                 "Megascans LiveLink Error initializing the import process. Error: ", str(e))
+        self.stepCount = len(self.assetList) * self.stepsPerAsset
+        self.steps = self.ImportSteps()
+
+    # Builder of the node setups of lazy placeholder materials (see MS_LazyMaterials).
+    # Unlike an import job it has no assets, prints nothing and keeps the folder listings.
+    @classmethod
+    def MaterialBuilder(cls):
+        builder = cls.__new__(cls)
+        builder.InitState([])
+        builder.ReadPrefs(bpy.context.preferences.addons[__name__].preferences)
+        return builder
+
+    def InitState(self, payloads):
+        self.payloads = payloads
+        self.assetList = []
+        self.stepCount = 0
+        self.stepsDone = 0
+        self.prefetch = {}
+        self.prefetchEnabled = False
+        self.hashTextures = False
+        self.preferHighestResolution = False
+        self.maxResolution = 0
+        self.lazyMaterials = False
+        self.useTemplates = False
+        self.packedMaps = {}
+        self.packedPaths = {}
+        self.packing = {}
+        self.conversions = {}
+        self.convertTextures = False
+        # Wall time in seconds spent in every import phase and counts of the Blender
+        # operations made, used to benchmark the import (see benchmarks/bench_import.py).
+        self.phaseTimes = collections.Counter()
+        self.operationCounts = collections.Counter()
+
+    def ReadPrefs(self, prefs):
+        globals()['MG_Telemetry'].enabled = prefs.collect_telemetry
+        self.lazyMaterials = prefs.lazy_materials
+        # Placeholder materials don't load textures, so there is nothing to prefetch.
+        self.prefetchEnabled = prefs.prefetch_textures and not self.lazyMaterials
+        self.hashTextures = prefs.hash_textures
+        self.preferHighestResolution = prefs.prefer_highest_resolution
+        self.maxResolution = int(prefs.max_texture_resolution)
+        # Proxies already replace the textures when a maximum resolution is set.
+        self.convertTextures = prefs.convert_textures and not self.maxResolution
+        self.conversionCacheDir = globals()['MG_TextureConverter'].CacheDir(prefs)
+        self.conversionCacheSize = prefs.conversion_cache_size * 1024 ** 3
+
+    # Advance the import until the time budget (in seconds) is spent.
+    # Returns True once every asset has been imported.
+    def Run(self, budget):
+        telemetry = globals()['MG_Telemetry']
+        deadline = time.perf_counter() + budget
+        stepStart = time.perf_counter()
+        for phase in self.steps:
+            stepEnd = time.perf_counter()
+            self.phaseTimes[phase] += stepEnd - stepStart
+            telemetry.Record(phase, stepStart, stepEnd - stepStart)
+            stepStart = stepEnd
+            self.stepsDone += 1
+            if stepEnd >= deadline:
+                return False
+        self.stepsDone = self.stepCount
+        return True
+
+    # Every step yields the name of the phase it just ran.
+    def ImportSteps(self):
+        # Start looping over each asset in the self.assetList list
+        for index, js in enumerate(self.assetList):
+            self.stepsDone = index * self.stepsPerAsset
+            try:
+                self.ParseAsset(js)
+            except Exception as e:
+                print(
+                    "Megascans LiveLink Error initializing the import process. Error: ", str(e))
+                continue
+            yield "parse"
+
+            # Initialize the import method to start building our shader and import our geometry
+            yield from self.initImportProcess()
+            print("Imported asset from " +
+                  self.assetName + " Quixel Bridge")
+            self.ReportPrefetch()
+
+        if len(globals()['MG_AlembicPath']) > 0:
+            globals()['MG_ImportComplete'] = True
+            globals()['MG_AlembicImporter'].Start()
+        if self.operationCounts["placeholder materials"] > 0:
+            globals()['MG_LazyMaterials'].Watch()
+        if self.convertTextures and self.conversionCacheDir is not None:
+            globals()['MG_TextureConverter'].ScheduleEviction(self.conversionCacheDir, self.conversionCacheSize)
+        globals()['MG_ImageCache'].Report()
+
+    def ParseAsset(self, js):
+        self.json_data = js
+        self.selectedObjects = []
+        self.assetType = self.json_data["type"]
+        self.assetPath = self.json_data["path"]
+        self.assetID = self.json_data["id"]
+        # Workflow setup
+        self.isMetal = bool(self.json_data["category"] == "Metal")
+        self.isHighPoly = bool(
+            self.json_data["activeLOD"] == "high")
+        self.activeLOD = self.json_data["activeLOD"]
+        self.minLOD = self.json_data["minLOD"]
+        self.isScatterAsset = self.CheckScatterAsset()
+        self.textureList = []
+        self.isBillboard = self.CheckIsBillboard()
+        self.ApplyToSelection = False
+        self.isAlembic = False
+        self.alembicPaths = []
+        # Files, bytes, background read time and main thread wait time of the prefetched textures.
+        self.prefetchStats = [0, 0, 0.0, 0.0]
+        self.packedMaps = {}
+        self.packedPaths = {}
+        self.packing = {}
+        self.conversions = {}
+
+        if "applyToSelection" in self.json_data.keys():
+            self.ApplyToSelection = bool(
+                self.json_data["applyToSelection"])
+
+        texturesListName = "components"
+        if(self.isBillboard):
+            texturesListName = "components"
+
+        self.textureTypes = set(obj["type"]
+                                for obj in self.json_data[texturesListName])
+        self.textureList = []
+        # Path of the first texture of every type, used to look textures up while building the material.
+        self.textureDict = {}
+
+        for obj in self.json_data[texturesListName]:
+            texFormat = obj["format"]
+            texType = obj["type"]
+            texPath = obj["path"]
+
+            # Pick the preferred variant of the texture from the cached listing of its folder.
+            resolveStart = time.perf_counter()
+            texFormat, texPath = globals()['MG_DirectoryIndex'].ResolveTexture(
+                texPath, texType, texFormat, self.preferHighestResolution)
+            globals()['MG_Telemetry'].Record("resolve", resolveStart, time.perf_counter() - resolveStart)
+            # Replace diffuse texture type with albedo so we don't have to add more conditions to handle diffuse map.
+            if texType == "diffuse" and "albedo" not in self.textureTypes:
+                texType = "albedo"
+                self.textureTypes.add("albedo")
+                self.textureTypes.discard("diffuse")
+
+            self.textureList.append((texFormat, texType, texPath))
+            self.textureDict.setdefault(texType, texPath.replace("\\", "/"))
+
+        # Read the textures the material will load in the background while the geometry
+        # is imported, unless the material of a previous import is reused.
+        prefs = bpy.context.preferences.addons[__name__].preferences
+        # Start packing the channels of the material, the packer reads the packed maps itself.
+        if not self.lazyMaterials and not self.IsMaterialRegistered(prefs):
+            self.PreparePackedMaps(prefs)
+        if self.prefetchEnabled and not self.IsMaterialRegistered(prefs):
+            for texType, texPath in self.UsedTextures(prefs).items():
+                if texType not in self.packedMaps:
+                    self.PrefetchTexture(texPath)
+
+        # Start converting the textures the material will load, packed maps aren't loaded.
+        if self.convertTextures and not self.lazyMaterials and not self.IsMaterialRegistered(prefs):
+            for texType, texPath in self.UsedTextures(prefs).items():
+                if texType not in self.packedMaps:
+                    self.ConvertTexture(texPath, texType)
+
+        # Create a tuple list of all the 3d meshes  available.
+        # This tuple is composed of (meshFormat, meshPath)
+        self.geometryList = [(obj["format"], obj["path"])
+                             for obj in self.json_data["meshList"]]
+
+        # Create name of our asset. Multiple conditions are set here
+        # in order to make sure the asset actually has a name and that the name
+        # is short enough for us to use it. We compose a name with the ID otherwise.
+        if "name" in self.json_data.keys():
+            self.assetName = self.json_data["name"].replace(
+                " ", "_")
+        else:
+            self.assetName = os.path.basename(
+                self.json_data["path"]).replace(" ", "_")
+        if len(self.assetName.split("_")) > 2:
+            self.assetName = "_".join(
+                self.assetName.split("_")[:-1])
+
+        self.materialName = self.assetName + '_' + self.assetID
+        self.colorSpaces = ["sRGB", "Non-Color"]
 
-        globals()['Megascans_DataSet'] = None
     # this method is used to import the geometry and create the material setup.
+    # It yields after the geometry, material and link steps.
 
     def initImportProcess(self):
         try:
@@ -233,15 +548,39 @@ class MS_Init_ImportProcess():
                     self.CollectSelectedObjects()
 
                 self.ImportGeometry()
+                yield "geometry"
+
                 self.CreateMaterial()
+                if self.materialReused:
+                    self.operationCounts["reused materials"] += 1
+                elif self.lazyMaterials:
+                    # The node setup of placeholders is built later by MS_LazyMaterials.
+                    globals()['MG_MaterialRegistry'].Add(self.materialFingerprint, self.mat)
+                    self.operationCounts["placeholder materials"] += 1
+                elif self.materialCloned:
+                    self.SwapTemplateImages()
+                    globals()['MG_MaterialRegistry'].Add(self.materialFingerprint, self.mat)
+                    self.operationCounts["cloned materials"] += 1
+                else:
+                    self.SetupMaterial()
+                    globals()['MG_MaterialRegistry'].Add(self.materialFingerprint, self.mat)
+                    if self.useTemplates:
+                        globals()['MG_MaterialTemplates'].Add(self.templateSignature, self.mat)
+                    self.operationCounts["materials"] += 1
+                    self.operationCounts["nodes"] += len(self.nodes)
+                    self.operationCounts["links"] += len(self.mat.node_tree.links)
+                yield "material"
+
                 self.ApplyMaterialToGeometry()
                 if(self.isScatterAsset and len(self.selectedObjects) > 1):
                     self.ScatterAssetSetup()
 
-                self.SetupMaterial()
-
+                # Queue the Alembic files together with the material of their asset.
                 if self.isAlembic:
-                    globals()['MG_Material'].append(self.mat)
+                    globals()['MG_Material'][self.assetID] = self.mat
+                    globals()['MG_AlembicPath'].extend(
+                        (self.assetID, meshPath) for meshPath in self.alembicPaths)
+                yield "link"
             else:
                 print('The Render engine is not Octane, failed to import textures/geometry')
         except Exception as e:
@@ -251,37 +590,78 @@ class MS_Init_ImportProcess():
 
     def ImportGeometry(self):
         try:
-            # Import geometry
-            abcPaths = []
-            if len(self.geometryList) >= 1:
-                for obj in self.geometryList:
-                    meshPath = obj[1]
-                    meshFormat = obj[0]
-
-                    if meshFormat.lower() == "fbx":
-                        bpy.ops.import_scene.fbx(filepath=meshPath)
-                        # get selected objects
-                        obj_objects = [
-                            o for o in bpy.context.scene.objects if o.select_get()]
-                        self.selectedObjects += obj_objects
-
-                    elif meshFormat.lower() == "obj":
-                        bpy.ops.import_scene.obj(
-                            filepath=meshPath, use_split_objects=True, use_split_groups=True)
-                        # get selected objects
-                        obj_objects = [
-                            o for o in bpy.context.scene.objects if o.select_get()]
-                        self.selectedObjects += obj_objects
-
-                    elif meshFormat.lower() == "abc":
-                        self.isAlembic = True
-                        abcPaths.append(meshPath)
-
-            if self.isAlembic:
-                globals()['MG_AlembicPath'].append(abcPaths)
+            prefs = bpy.context.preferences.addons[__name__].preferences
+            # Group the meshes by importer. With "Import all LODs" every LOD file found next
+            # to each mesh is imported as well.
+            meshPaths = {"fbx": [], "obj": [], "abc": []}
+            for meshFormat, meshPath in self.geometryList:
+                meshFormat = meshFormat.lower()
+                if meshFormat not in meshPaths:
+                    continue
+                paths = [meshPath]
+                if prefs.import_all_lods and meshFormat != "abc":
+                    paths = globals()['MG_DirectoryIndex'].LODFiles(meshPath)
+                for path in paths:
+                    if path not in meshPaths[meshFormat]:
+                        meshPaths[meshFormat].append(path)
+
+            # Create linked duplicates of the objects of a previous import of the same files.
+            meshCache = globals()['MG_MeshCache']
+            meshKey = meshCache.Key(meshPaths["fbx"] + meshPaths["obj"])
+            cachedObjects = meshCache.Get(meshKey) if prefs.instance_repeated_meshes else None
+            if cachedObjects:
+                duplicates = meshCache.Duplicate(cachedObjects)
+                self.selectedObjects += duplicates
+                if prefs.import_all_lods:
+                    self.LinkToAssetCollection(duplicates)
+                self.operationCounts["instanced imports"] += 1
+
+            elif meshPaths["fbx"] or meshPaths["obj"]:
+                # Find the imported objects by diffing the objects before and after the
+                # import instead of checking the selection of every object in the scene.
+                objectsBefore = set(bpy.data.objects)
+                self.ImportFiles(bpy.ops.import_scene.fbx, meshPaths["fbx"])
+                # The OBJ importer takes a single file.
+                for meshPath in meshPaths["obj"]:
+                    self.operationCounts["geometry imports"] += 1
+                    bpy.ops.import_scene.obj(
+                        filepath=meshPath, use_split_objects=True, use_split_groups=True)
+                importedObjects = [o for o in bpy.data.objects if o not in objectsBefore]
+                self.selectedObjects += importedObjects
+                if meshKey is not None:
+                    meshCache.Add(meshKey, importedObjects)
+                if prefs.import_all_lods:
+                    self.LinkToAssetCollection(importedObjects)
+
+            if meshPaths["abc"]:
+                self.isAlembic = True
+                self.alembicPaths = meshPaths["abc"]
         except Exception as e:
             print("Megascans Plugin Error while importing textures/geometry or setting up material. Error: ", str(e))
 
+    # Import files with one importer call per folder.
+    def ImportFiles(self, importer, paths):
+        folders = collections.OrderedDict()
+        for path in paths:
+            directory, fileName = os.path.split(path)
+            folders.setdefault(directory, []).append({"name": fileName})
+        for directory, files in folders.items():
+            self.operationCounts["geometry imports"] += 1
+            importer(filepath=os.path.join(directory, files[0]["name"]),
+                     directory=directory, files=files)
+
+    # Move the objects into one collection named after the asset.
+    def LinkToAssetCollection(self, objects):
+        collectionName = self.assetName + "_" + self.assetID
+        collection = bpy.data.collections.get(collectionName)
+        if collection is None:
+            collection = bpy.data.collections.new(collectionName)
+            bpy.context.scene.collection.children.link(collection)
+        for obj in objects:
+            for userCollection in list(obj.users_collection):
+                userCollection.objects.unlink(obj)
+            collection.objects.link(obj)
+
     def dump(self, obj):
         for attr in dir(obj):
             print("obj.%s = %r" % (attr, getattr(obj, attr)))
@@ -314,21 +694,125 @@ class MS_Init_ImportProcess():
         return False
 
     def ScatterAssetSetup(self):
+        prefs = bpy.context.preferences.addons[__name__].preferences
         # Create an empty object
-        bpy.ops.object.empty_add(type='SPHERE', radius=0.2)
-        emptyRefList = [o for o in bpy.context.scene.objects if o.select_get(
-        ) and o not in self.selectedObjects]
-        for scatterParentObject in emptyRefList:
-            scatterParentObject.name = self.assetID + "_" + self.assetName
+        scatterName = self.assetID + "_" + self.assetName
+        scatterEmpty = bpy.data.objects.new(scatterName, None)
+        scatterEmpty.empty_display_type = 'SPHERE'
+        scatterEmpty.empty_display_size = 0.2
+        scatterEmpty.location = bpy.context.scene.cursor.location
+        bpy.context.collection.objects.link(scatterEmpty)
+
+        if prefs.scatter_mode == 'COLLECTION':
+            # Move the variations into their own collection, excluded from the view layer,
+            # and instance it from the empty. The same collection can be used as the instance
+            # collection of particle systems or a Collection Info node, so scattered copies
+            # are rendered as instances instead of separate objects.
+            variations = bpy.data.collections.new(scatterName)
+            bpy.context.scene.collection.children.link(variations)
+            for obj in self.selectedObjects:
+                for userCollection in list(obj.users_collection):
+                    userCollection.objects.unlink(obj)
+                variations.objects.link(obj)
+            layerCollection = bpy.context.view_layer.layer_collection.children.get(variations.name)
+            if layerCollection is not None:
+                layerCollection.exclude = True
+            scatterEmpty.instance_type = 'COLLECTION'
+            scatterEmpty.instance_collection = variations
+        else:
             for obj in self.selectedObjects:
-                obj.parent = scatterParentObject
-            break
+                obj.parent = scatterEmpty
 
     # Material setup
     # Shader setups for all asset types. Some type specific functionality is also handled here.
     def CreateMaterial(self):
         prefs = bpy.context.preferences.addons[__name__].preferences
-        self.mat = bpy.data.materials.new(self.materialName)
+
+        # Reuse the material built by a previous import of the same asset with the same settings.
+        self.materialFingerprint = self.MaterialFingerprint(prefs)
+        self.materialReused = False
+        self.materialCloned = False
+        if prefs.reuse_materials:
+            mat = globals()['MG_MaterialRegistry'].Get(self.materialFingerprint)
+            if mat is not None:
+                self.mat = mat
+                self.materialReused = True
+                return
+
+        # Copy the node setup built for a previous asset with the same maps instead of
+        # creating every node again. Only the images are swapped afterwards.
+        self.useTemplates = prefs.use_material_templates and not self.lazyMaterials
+        self.CollectPackedMaps()
+        template = None
+        if self.useTemplates:
+            self.templateSignature = self.TemplateSignature(prefs)
+            template = globals()['MG_MaterialTemplates'].Get(self.templateSignature)
+
+        if template is not None:
+            self.mat = template.copy()
+            self.mat.name = self.materialName
+            self.nodes = self.mat.node_tree.nodes
+            self.materialCloned = True
+        else:
+            self.mat = bpy.data.materials.new(self.materialName)
+        self.mat[MS_MaterialRegistry.fingerprintKey] = self.materialFingerprint
+
+        # In lazy mode only the textures the material needs are stored on it for now.
+        if self.lazyMaterials:
+            self.mat[MS_LazyMaterials.manifestKey] = json.dumps(
+                {"textures": self.textureDict, "isMetal": self.isMetal})
+        elif not self.materialCloned:
+            self.CreateMaterialNodes(prefs)
+
+    # Identify the node setup: the maps that get nodes and every preference changing the nodes.
+    def TemplateSignature(self, prefs):
+        settings = [[spec["type"] for spec, imgPath in self.ActiveMapSpecs(prefs)],
+                    bool(self.GetTexturePath("ao")), self.isMetal, sorted(self.packedMaps.items()),
+                    prefs.brdf_model, prefs.disp_type, prefs.disp_level_texture, prefs.disp_level_vertex]
+        return hashlib.sha1(json.dumps(settings).encode()).hexdigest()
+
+    # Load the textures of the asset into the image nodes of a material copied from a template.
+    def SwapTemplateImages(self):
+        prefs = bpy.context.preferences.addons[__name__].preferences
+        buildStart = time.perf_counter()
+        maps = [(spec["type"], imgPath, spec["colorSpace"]) for spec, imgPath in self.ActiveMapSpecs(prefs)]
+        aoPath = self.GetTexturePath("ao")
+        if aoPath and "albedo" in self.textureDict:
+            maps.append(("ao", aoPath, "Non-Color"))
+        # Packed maps only have a channel picker node, their packed images are swapped instead.
+        maps = [m for m in maps if m[0] not in self.packedMaps] + self.PackedImages()
+        for texType, imgPath, colorSpace in maps:
+            texNode = self.nodes.get(MS_MaterialTemplates.nodePrefix + texType)
+            if texNode is not None:
+                texNode.image = self.LoadImage(imgPath)
+                texNode.image.colorspace_settings.name = colorSpace
+                if texType in self.packedPaths:
+                    texNode.image.alpha_mode = 'CHANNEL_PACKED'
+        globals()['MG_Telemetry'].Record("material build", buildStart, time.perf_counter() - buildStart)
+
+    # Build the node setup of a placeholder material created in lazy mode.
+    def RealizeMaterial(self, mat):
+        prefs = bpy.context.preferences.addons[__name__].preferences
+        manifest = json.loads(mat[MS_LazyMaterials.manifestKey])
+        self.textureDict = manifest["textures"]
+        self.isMetal = manifest["isMetal"]
+        self.prefetchStats = [0, 0, 0.0, 0.0]
+        self.mat = mat
+        self.packedMaps = {}
+        self.packedPaths = {}
+        self.packing = {}
+        self.PreparePackedMaps(prefs)
+        if self.convertTextures:
+            for texType, texPath in self.UsedTextures(prefs).items():
+                if texType not in self.packedMaps:
+                    self.ConvertTexture(texPath, texType)
+        self.CollectPackedMaps()
+        self.CreateMaterialNodes(prefs)
+        self.SetupMaterial()
+        del mat[MS_LazyMaterials.manifestKey]
+        self.operationCounts["realized materials"] += 1
+
+    def CreateMaterialNodes(self, prefs):
         self.mat.use_nodes = True
         self.nodes = self.mat.node_tree.nodes
 
@@ -347,384 +831,1822 @@ class MS_Init_ImportProcess():
         self.mainMat.inputs['Dielectric IOR'].default_value = 1.5
         self.mainMat.inputs['Specular'].default_value = 0.5
 
+    def IsMaterialRegistered(self, prefs):
+        return prefs.reuse_materials and globals()['MG_MaterialRegistry'].Get(self.MaterialFingerprint(prefs)) is not None
+
+    # Identify the material by the asset, its textures and every preference that changes the node setup.
+    def MaterialFingerprint(self, prefs):
+        settings = [self.assetID, self.isMetal, sorted(self.textureList),
+                    prefs.brdf_model, prefs.disp_type, prefs.disp_level_texture, prefs.disp_level_vertex,
+                    prefs.is_cavity_enabled, prefs.is_curvature_enabled, prefs.is_bump_enabled, prefs.is_fuze_enabled,
+                    prefs.max_texture_resolution, prefs.pack_channels, prefs.convert_textures]
+        return hashlib.sha1(json.dumps(settings).encode()).hexdigest()
+
+    # Texture map specs used by SetupMaterial, in node layout order. Every map gets an
+    # Octane image texture node linked to the shared transform node. Optional keys:
+    #   socket   - input of the universal material the texture is linked to
+    #   pref     - add-on preference that has to be enabled for the map to be imported
+    #   location - fixed node location instead of the next slot of the texture column
+    #   setup    - method creating the extra nodes of the map, called with (texNode, prefs, links)
+    mapSpecs = [
+        {"type": "albedo", "colorSpace": "sRGB", "setup": "SetupAlbedoMap"},
+        {"type": "specular", "colorSpace": "sRGB", "socket": "Specular"},
+        {"type": "roughness", "colorSpace": "Non-Color", "socket": "Roughness"},
+        {"type": "metalness", "colorSpace": "Non-Color", "socket": "Metallic"},
+        {"type": "displacement", "colorSpace": "Non-Color", "setup": "SetupDisplacementMap"},
+        {"type": "translucency", "colorSpace": "Non-Color", "socket": "Transmission", "setup": "SetupTranslucencyMap"},
+        {"type": "opacity", "colorSpace": "Non-Color", "location": (256, 0), "setup": "SetupOpacityMap"},
+        {"type": "normal", "colorSpace": "sRGB", "socket": "Normal"},
+        {"type": "bump", "colorSpace": "Non-Color", "pref": "is_bump_enabled"},
+        {"type": "cavity", "colorSpace": "Non-Color", "pref": "is_cavity_enabled"},
+        {"type": "curvature", "colorSpace": "Non-Color", "pref": "is_curvature_enabled"},
+        {"type": "fuzz", "colorSpace": "Non-Color", "pref": "is_fuze_enabled"},
+    ]
+
     def SetupMaterial(self):
         prefs = bpy.context.preferences.addons[__name__].preferences
+        buildStart = time.perf_counter()
         y_exp = 320
 
-        transNode = self.nodes.new('ShaderNodeOct3DTransform')
-        transNode.location = (-1200, 0)
+        self.transNode = self.nodes.new('ShaderNodeOct3DTransform')
+        self.transNode.location = (-1200, 0)
 
-        # Create the albedo setup.
-        if "albedo" in self.textureTypes:
-            imgPath = self.GetTexturePath("albedo")
-            if len(imgPath) >= 1:
-                texNode = self.nodes.new('ShaderNodeOctImageTex')
+        # Create the nodes of every map first and collect their links, which are then
+        # created in a single pass.
+        links = []
+        for spec, imgPath in self.ActiveMapSpecs(prefs):
+            if "location" in spec:
+                location = spec["location"]
+            else:
                 y_exp += -320
-                texNode.location = (-720, y_exp)
-                texNode.image = bpy.data.images.load(imgPath)
-                texNode.show_texture = True
-                texNode.image.colorspace_settings.name = self.colorSpaces[0]
-
-                if "ao" in self.textureTypes:
-                    aoPath = self.GetTexturePath("ao")
-                    if len(aoPath) >= 1:
-                        aoNode = self.nodes.new('ShaderNodeOctImageTex')
-                        aoNode.image = bpy.data.images.load(aoPath)
-                        aoNode.image.colorspace_settings.name = self.colorSpaces[1]
-                        aoNode.location = (-720, y_exp + 320)
-                        multiplyNode = self.nodes.new(
-                            'ShaderNodeOctMultiplyTex')
-                        multiplyNode.location = (-320, 180)
-                        self.mat.node_tree.links.new(
-                            multiplyNode.inputs[1], texNode.outputs[0])
-                        self.mat.node_tree.links.new(
-                            multiplyNode.inputs[0], aoNode.outputs[0])
-                        self.mat.node_tree.links.new(
-                            self.mainMat.inputs['Albedo color'], multiplyNode.outputs[0])
-                        # Link transform node
-                        self.mat.node_tree.links.new(
-                            aoNode.inputs['Transform'], transNode.outputs[0])
-                        self.mat.node_tree.links.new(
-                            texNode.inputs['Transform'], transNode.outputs[0])
-                else:
-                    self.mat.node_tree.links.new(
-                        self.mainMat.inputs['Albedo color'], texNode.outputs[0])
-                    # Link transform node
-                    self.mat.node_tree.links.new(
-                        texNode.inputs['Transform'], transNode.outputs[0])
-
-        # Create the specular map setup
-        if "specular" in self.textureTypes:
-            imgPath = self.GetTexturePath('specular')
-            if len(imgPath) >= 1:
-                texNode = self.nodes.new('ShaderNodeOctImageTex')
+                location = (-720, y_exp)
+            texNode = self.CreateImageNode(spec["type"], imgPath, spec["colorSpace"], location, links)
+            if "socket" in spec:
+                links.append((self.mainMat.inputs[spec["socket"]], texNode.outputs[0]))
+            if "setup" in spec:
+                getattr(self, spec["setup"])(texNode, prefs, links)
+
+        linkStart = time.perf_counter()
+        nodeLinks = self.mat.node_tree.links
+        for toSocket, fromSocket in links:
+            nodeLinks.new(toSocket, fromSocket)
+        globals()['MG_Telemetry'].Record("node links", linkStart, time.perf_counter() - linkStart)
 
-                y_exp += -320
-                texNode.location = (-720, y_exp)
-
-                texNode.image = bpy.data.images.load(imgPath)
-                texNode.show_texture = True
-                texNode.image.colorspace_settings.name = self.colorSpaces[0]
-
-                self.mat.node_tree.links.new(
-                    self.mainMat.inputs['Specular'], texNode.outputs[0])
-                # Link transform node
-                self.mat.node_tree.links.new(
-                    texNode.inputs['Transform'], transNode.outputs[0])
-
-        # Create the roughness setup.
-        if "roughness" in self.textureTypes:
-            imgPath = self.GetTexturePath("roughness")
-            if len(imgPath) >= 1:
-                texNode = self.nodes.new('ShaderNodeOctImageTex')
-                y_exp += -320
-                texNode.location = (-720, y_exp)
-                texNode.image = bpy.data.images.load(imgPath)
-                texNode.show_texture = True
-                texNode.image.colorspace_settings.name = self.colorSpaces[1]
-
-                self.mat.node_tree.links.new(
-                    self.mainMat.inputs['Roughness'], texNode.outputs[0])
-                # Link transform node
-                self.mat.node_tree.links.new(
-                    texNode.inputs['Transform'], transNode.outputs[0])
-
-        # Create the metalness setup
-        if "metalness" in self.textureTypes:
-            imgPath = self.GetTexturePath("metalness")
-            if len(imgPath) >= 1:
-                texNode = self.nodes.new('ShaderNodeOctImageTex')
-                y_exp += -320
-                texNode.location = (-720, y_exp)
-                texNode.image = bpy.data.images.load(imgPath)
-                texNode.show_texture = True
-                texNode.image.colorspace_settings.name = self.colorSpaces[1]
-
-                self.mat.node_tree.links.new(
-                    self.mainMat.inputs['Metallic'], texNode.outputs[0])
-                # Link transform node
-                self.mat.node_tree.links.new(
-                    texNode.inputs['Transform'], transNode.outputs[0])
-
-        # Create the displacement setup.
-        if "displacement" in self.textureTypes:
-            imgPath = self.GetTexturePath("displacement")
-            if len(imgPath) >= 1:
-                texNode = self.nodes.new('ShaderNodeOctImageTex')
-                y_exp += -320
-                texNode.location = (-720, y_exp)
-                texNode.image = bpy.data.images.load(imgPath)
-                texNode.show_texture = True
-                texNode.image.colorspace_settings.name = self.colorSpaces[1]
-                if prefs.disp_type == "VERTEX":
-                    texNode.border_mode = 'OCT_BORDER_MODE_CLAMP'
-
-                if prefs.disp_type == "TEXTURE":
-                    dispNode = self.nodes.new(
-                        'ShaderNodeOctDisplacementTex')
-                    dispNode.displacement_level = prefs.disp_level_texture
-                    #dispNode.displacement_filter = 'OCTANE_FILTER_TYPE_BOX'
-                    dispNode.displacement_surface = 'OCTANE_DISPLACEMENT_SMOOTH_NORMAL'
-                    dispNode.inputs['Mid level'].default_value = 0.5
-                    dispNode.inputs['Height'].default_value = 0.1
-                else:
-                    dispNode = self.nodes.new(
-                        'ShaderNodeOctVertexDisplacementTex')
-                    dispNode.inputs['Auto bump map'].default_value = True
-                    dispNode.inputs['Mid level'].default_value = 0.1
-                    dispNode.inputs['Height'].default_value = 0.1
-                    dispNode.inputs['Subdivision level'].default_value = prefs.disp_level_vertex
-
-                dispNode.location = (-360, -680)
-
-                self.mat.node_tree.links.new(
-                    dispNode.inputs['Texture'], texNode.outputs[0])
-                self.mat.node_tree.links.new(
-                    self.mainMat.inputs['Displacement'], dispNode.outputs[0])
-                # Link transform node
-                self.mat.node_tree.links.new(
-                    texNode.inputs['Transform'], transNode.outputs[0])
-
-        # Create the translucency setup.
-        if "translucency" in self.textureTypes:
-            imgPath = self.GetTexturePath('translucency')
-            if len(imgPath) >= 1:
-                texNode = self.nodes.new('ShaderNodeOctImageTex')
-                y_exp += -320
-                texNode.location = (-720, y_exp)
-                texNode.image = bpy.data.images.load(imgPath)
-                texNode.show_texture = True
-                texNode.image.colorspace_settings.name = self.colorSpaces[1]
-
-                scatterNode = self.nodes.new(
-                    'ShaderNodeOctScatteringMedium')
-                scatterNode.inputs['Absorption Tex'].default_value = (
-                    1, 1, 1, 1)
-                scatterNode.inputs['Invert abs.'].default_value = True
-                scatterNode.location = (-360, -1000)
-
-                self.mat.node_tree.links.new(
-                    self.mainMat.inputs['Transmission'], texNode.outputs[0])
-                self.mat.node_tree.links.new(
-                    self.mainMat.inputs['Medium'], scatterNode.outputs[0])
-                # Link transform node
-                self.mat.node_tree.links.new(
-                    texNode.inputs['Transform'], transNode.outputs[0])
-
-        # Create the opacity setup
-        if "opacity" in self.textureTypes:
-            imgPath = self.GetTexturePath('opacity')
-            if len(imgPath) >= 1:
-                texNode = self.nodes.new('ShaderNodeOctImageTex')
-                # y_exp += -320
-                texNode.location = (256, 0)
-                texNode.image = bpy.data.images.load(imgPath)
-                texNode.show_texture = True
-                texNode.image.colorspace_settings.name = self.colorSpaces[1]
-
-                mixNode = self.nodes.new('ShaderNodeOctMixMat')
-                mixNode.location = (630, 0)
-                mixNode.inputs['Amount'].default_value = 1
-                self.mat.node_tree.links.new(
-                    mixNode.inputs['Amount'], texNode.outputs[0])
-
-                transpNode = self.nodes.new('ShaderNodeOctDiffuseMat')
-                transpNode.location = (256, -320)
-                transpNode.inputs['Opacity'].default_value = 0
-
-                self.mat.node_tree.links.new(
-                    mixNode.inputs['Material1'], self.mainMat.outputs[0])
-                self.mat.node_tree.links.new(
-                    mixNode.inputs['Material2'], transpNode.outputs[0])
-
-                self.mat.node_tree.links.new(
-                    self.outNode.inputs['Surface'], mixNode.outputs[0])
-
-                self.mat.blend_method = 'CLIP'
-                self.mat.shadow_method = 'CLIP'
-
-                # Link transform node
-                self.mat.node_tree.links.new(
-                    texNode.inputs['Transform'], transNode.outputs[0])
-
-        # Create the normal map setup for Redshift.
-        if "normal" in self.textureTypes:
-            imgPath = self.GetTexturePath('normal')
-            if len(imgPath) >= 1:
-                texNode = self.nodes.new('ShaderNodeOctImageTex')
-                y_exp += -320
-                texNode.location = (-720, y_exp)
-
-                texNode.image = bpy.data.images.load(imgPath)
-                texNode.show_texture = True
-                texNode.image.colorspace_settings.name = self.colorSpaces[0]
-                self.mat.node_tree.links.new(
-                    self.mainMat.inputs['Normal'], texNode.outputs[0])
-                # Link transform node
-                self.mat.node_tree.links.new(
-                    texNode.inputs['Transform'], transNode.outputs[0])
-
-        # Create the bump map setup
-        if ("bump" in self.textureTypes) and (prefs.is_bump_enabled):
-            imgPath = self.GetTexturePath("bump")
-            if len(imgPath) >= 1:
-                texNode = self.nodes.new('ShaderNodeOctImageTex')
+        # Deselect all nodes
+        for node in self.nodes:
+            node.select = False
 
-                y_exp += -320
-                texNode.location = (-720, y_exp)
+        globals()['MG_Telemetry'].Record("material build", buildStart, time.perf_counter() - buildStart)
+        # End of material setup
 
-                texNode.image = bpy.data.images.load(imgPath)
-                texNode.show_texture = True
-                texNode.image.colorspace_settings.name = self.colorSpaces[1]
+    # Yield the specs of the maps of the asset that get a node, with their texture paths.
+    def ActiveMapSpecs(self, prefs):
+        for spec in self.mapSpecs:
+            if "pref" in spec and not getattr(prefs, spec["pref"]):
+                continue
+            # Maps that wouldn't be connected to anything are skipped when importing for look development.
+            if self.maxResolution and "socket" not in spec and "setup" not in spec:
+                continue
+            imgPath = self.GetTexturePath(spec["type"])
+            if imgPath:
+                yield spec, imgPath
+
+    # Start channel packing the single channel maps of the asset (see MS_ChannelPacker).
+    # Fills self.packedMaps with {map type: (packed image name, channel index)} and
+    # self.packing with {packed image name: future of the path}.
+    def PreparePackedMaps(self, prefs):
+        if not prefs.pack_channels:
+            return
+        activeTypes = self.UsedTextures(prefs)
+        packer = globals()['MG_ChannelPacker']
+        for groupIndex, group in enumerate(packer.groups):
+            sources = [self.GetTexturePath(texType) if texType in activeTypes else None for texType in group]
+            if sum(1 for source in sources if source) < 2:
+                continue
+            future = packer.Submit(sources)
+            if future is None:
+                continue
+            packedName = "packed%d" % groupIndex
+            self.packing[packedName] = future
+            for channel, source in enumerate(sources):
+                if source:
+                    self.packedMaps[group[channel]] = (packedName, channel)
+
+    # Wait for the packed images started by PreparePackedMaps. The maps of a group that
+    # couldn't be packed get their own image nodes instead.
+    def CollectPackedMaps(self):
+        for packedName, future in sorted(self.packing.items()):
+            packedPath = future.result()
+            if packedPath is not None:
+                self.packedPaths[packedName] = packedPath
+                continue
+            for texType, (name, channel) in list(self.packedMaps.items()):
+                if name == packedName:
+                    del self.packedMaps[texType]
+        self.packing = {}
+
+    # (node name suffix, path, color space) of the channel packed images.
+    def PackedImages(self):
+        return [(packedName, packedPath, "Non-Color") for packedName, packedPath in sorted(self.packedPaths.items())]
+
+    # {map type: path} of the textures that get a node, including the AO multiplied with the albedo.
+    def UsedTextures(self, prefs):
+        textures = dict((spec["type"], imgPath) for spec, imgPath in self.ActiveMapSpecs(prefs))
+        if "albedo" in textures and self.GetTexturePath("ao"):
+            textures["ao"] = self.GetTexturePath("ao")
+        return textures
+
+    def CreateImageNode(self, texType, imgPath, colorSpace, location, links):
+        # Channel packed maps read their channel of the shared packed image node.
+        if texType in self.packedMaps:
+            return self.CreateChannelNode(texType, location, links)
+        texNode = self.nodes.new('ShaderNodeOctImageTex')
+        # Named after the map so the image can be swapped in copies of the material.
+        texNode.name = MS_MaterialTemplates.nodePrefix + texType
+        texNode.location = location
+        texNode.image = self.LoadImage(imgPath)
+        texNode.show_texture = True
+        texNode.image.colorspace_settings.name = colorSpace
+        # Link transform node
+        links.append((texNode.inputs['Transform'], self.transNode.outputs[0]))
+        return texNode
+
+    def CreateChannelNode(self, texType, location, links):
+        packedName, channel = self.packedMaps[texType]
+        packedNode = self.nodes.get(MS_MaterialTemplates.nodePrefix + packedName)
+        if packedNode is None:
+            packedNode = self.CreateImageNode(packedName, self.packedPaths[packedName], "Non-Color", (-1000, location[1]), links)
+            packedNode.image.alpha_mode = 'CHANNEL_PACKED'
+        pickerNode = self.nodes.new(MS_ChannelPacker.pickerNode)
+        pickerNode.name = MS_MaterialTemplates.nodePrefix + texType
+        pickerNode.location = location
+        pickerNode.inputs['Channel'].default_value = MS_ChannelPacker.pickerChannels[channel]
+        links.append((pickerNode.inputs['Texture'], packedNode.outputs[0]))
+        return pickerNode
+
+    # Multiply the albedo with the AO map when there is one.
+    def SetupAlbedoMap(self, texNode, prefs, links):
+        aoPath = self.GetTexturePath("ao")
+        if not aoPath:
+            links.append((self.mainMat.inputs['Albedo color'], texNode.outputs[0]))
+            return
+
+        aoNode = self.CreateImageNode("ao", aoPath, "Non-Color", (-720, texNode.location[1] + 320), links)
+        multiplyNode = self.nodes.new('ShaderNodeOctMultiplyTex')
+        multiplyNode.location = (-320, 180)
+        links.append((multiplyNode.inputs[1], texNode.outputs[0]))
+        links.append((multiplyNode.inputs[0], aoNode.outputs[0]))
+        links.append((self.mainMat.inputs['Albedo color'], multiplyNode.outputs[0]))
+
+    def SetupDisplacementMap(self, texNode, prefs, links):
+        if prefs.disp_type == "TEXTURE":
+            dispNode = self.nodes.new(
+                'ShaderNodeOctDisplacementTex')
+            dispNode.displacement_level = prefs.disp_level_texture
+            #dispNode.displacement_filter = 'OCTANE_FILTER_TYPE_BOX'
+            dispNode.displacement_surface = 'OCTANE_DISPLACEMENT_SMOOTH_NORMAL'
+            dispNode.inputs['Mid level'].default_value = 0.5
+            dispNode.inputs['Height'].default_value = 0.1
+        else:
+            texNode.border_mode = 'OCT_BORDER_MODE_CLAMP'
+            dispNode = self.nodes.new(
+                'ShaderNodeOctVertexDisplacementTex')
+            dispNode.inputs['Auto bump map'].default_value = True
+            dispNode.inputs['Mid level'].default_value = 0.1
+            dispNode.inputs['Height'].default_value = 0.1
+            dispNode.inputs['Subdivision level'].default_value = prefs.disp_level_vertex
+
+        dispNode.location = (-360, -680)
+        links.append((dispNode.inputs['Texture'], texNode.outputs[0]))
+        links.append((self.mainMat.inputs['Displacement'], dispNode.outputs[0]))
+
+    def SetupTranslucencyMap(self, texNode, prefs, links):
+        scatterNode = self.nodes.new(
+            'ShaderNodeOctScatteringMedium')
+        scatterNode.inputs['Absorption Tex'].default_value = (
+            1, 1, 1, 1)
+        scatterNode.inputs['Invert abs.'].default_value = True
+        scatterNode.location = (-360, -1000)
+        links.append((self.mainMat.inputs['Medium'], scatterNode.outputs[0]))
+
+    # Mix the material with a transparent diffuse material using the opacity map.
+    def SetupOpacityMap(self, texNode, prefs, links):
+        mixNode = self.nodes.new('ShaderNodeOctMixMat')
+        mixNode.location = (630, 0)
+        mixNode.inputs['Amount'].default_value = 1
+
+        transpNode = self.nodes.new('ShaderNodeOctDiffuseMat')
+        transpNode.location = (256, -320)
+        transpNode.inputs['Opacity'].default_value = 0
+
+        links.append((mixNode.inputs['Amount'], texNode.outputs[0]))
+        links.append((mixNode.inputs['Material1'], self.mainMat.outputs[0]))
+        links.append((mixNode.inputs['Material2'], transpNode.outputs[0]))
+        links.append((self.outNode.inputs['Surface'], mixNode.outputs[0]))
+
+        self.mat.blend_method = 'CLIP'
+        self.mat.shadow_method = 'CLIP'
+
+    # Texture loading
+
+    def PrefetchTexture(self, texPath):
+        texPath = texPath.replace("\\", "/")
+        if texPath not in self.prefetch:
+            self.prefetch[texPath] = globals()['MG_TexturePrefetcher'].Submit(texPath, self.hashTextures)
+
+    def LoadImage(self, imgPath):
+        future = self.prefetch.pop(imgPath, None)
+        if future is not None:
+            waitStart = time.perf_counter()
+            try:
+                size, readTime = future.result()
+            except Exception:
+                size, readTime = 0, 0.0
+            self.prefetchStats[0] += 1
+            self.prefetchStats[1] += size
+            self.prefetchStats[2] += readTime
+            self.prefetchStats[3] += time.perf_counter() - waitStart
+        self.operationCounts["image loads"] += 1
+
+        # Load the converted texture, or a downscaled proxy instead when the texture is
+        # larger than the resolution cap. A texture still being converted is loaded as is
+        # and replaced by the converted file once it is ready (see MS_TextureConverter.Defer).
+        loadPath = imgPath
+        conversion = self.conversions.pop(imgPath, None)
+        if conversion is not None and conversion.done():
+            loadPath = conversion.result()
+            if loadPath != imgPath:
+                self.operationCounts["converted textures"] += 1
+        elif self.maxResolution:
+            loadPath = globals()['MG_TextureProxies'].Get(imgPath, self.maxResolution)
+        loadStart = time.perf_counter()
+        image = globals()['MG_ImageCache'].Load(loadPath, self.hashTextures)
+        globals()['MG_Telemetry'].Record("images.load", loadStart, time.perf_counter() - loadStart)
+        if self.maxResolution and loadPath != imgPath:
+            image[MS_TextureProxies.fullResKey] = imgPath
+        if conversion is not None and not conversion.done():
+            globals()['MG_TextureConverter'].Defer(image.name, imgPath, conversion)
+            self.operationCounts["deferred conversions"] += 1
+        return image
+
+    def ConvertTexture(self, texPath, texType):
+        texPath = texPath.replace("\\", "/")
+        if texPath not in self.conversions:
+            future = globals()['MG_TextureConverter'].Submit(texPath, texType, self.conversionCacheDir)
+            if future is not None:
+                self.conversions[texPath] = future
+
+    def ReportPrefetch(self):
+        # Forget the reads of textures that weren't loaded through LoadImage, e.g. channel packed maps.
+        self.prefetch.clear()
+        files, size, readTime, waitTime = self.prefetchStats
+        if files > 0:
+            print("Texture prefetch for %s: %d files, %.1f MB read in %.0f ms, waited %.0f ms, saved %.0f ms of I/O wait" % (
+                self.assetName, files, size / 1048576.0, readTime * 1000, waitTime * 1000, max(readTime - waitTime, 0) * 1000))
 
-                #self.mat.node_tree.links.new(self.mainMat.inputs['Bump'], texNode.outputs[0])
+    def GetTexturePath(self, textureType):
+        return self.textureDict.get(textureType)
+
+
+class MS_ImportQueue():
+
+    # Bounded FIFO of payloads received from Bridge and waiting to be imported.
+    # The receiver thread blocks in Put while the queue is full, which stops it reading
+    # from the sockets and lets TCP push back on Bridge instead of losing payloads.
+    # Closing the queue releases a blocked receiver so the listener can be stopped, the
+    # payloads refused while it is closed are counted as dropped.
+    # With coalescing enabled, Get hands every pending payload to a single import pass.
+    def __init__(self, maxsize=32, coalesce=False):
+        self.pending = collections.deque()
+        self.condition = threading.Condition()
+        self.maxsize = maxsize
+        self.coalesce = coalesce
+        self.enqueued = 0
+        self.processed = 0
+        self.dropped = 0
+        self.closed = False
+        # Set by the receiver thread whenever there is activity (new connection, data or payload)
+        # so the main thread timer knows to poll quickly.
+        self.activity = threading.Event()
+
+    def Configure(self, maxsize, coalesce):
+        with self.condition:
+            self.maxsize = maxsize
+            self.coalesce = coalesce
+            self.condition.notify_all()
+
+    def Open(self):
+        with self.condition:
+            self.closed = False
+
+    # Wake up a receiver waiting in Put and refuse payloads until the queue is opened again.
+    def Close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+    # Add a payload, waiting for free space. Returns False when the queue is closed.
+    def Put(self, payload):
+        with self.condition:
+            self.condition.wait_for(lambda: self.closed or len(self.pending) < self.maxsize)
+            if self.closed:
+                self.dropped += 1
+                return False
+            self.pending.append(payload)
+            self.enqueued += 1
+            self.activity.set()
+            return True
 
-                # Link transform node
-                self.mat.node_tree.links.new(
-                    texNode.inputs['Transform'], transNode.outputs[0])
+    # Return the payloads to import next: the oldest one, or all of them when coalescing.
+    def Get(self):
+        with self.condition:
+            if not self.pending:
+                return []
+            if self.coalesce:
+                payloads = list(self.pending)
+                self.pending.clear()
+            else:
+                payloads = [self.pending.popleft()]
+            self.condition.notify_all()
+            return payloads
+
+    def MarkProcessed(self, count=1):
+        with self.condition:
+            self.processed += count
+
+    def __len__(self):
+        with self.condition:
+            return len(self.pending)
+
+    def Stats(self):
+        with self.condition:
+            return {"pending": len(self.pending), "enqueued": self.enqueued,
+                    "processed": self.processed, "dropped": self.dropped}
+
+globals()['MG_ImportQueue'] = MS_ImportQueue()
+
+
+class MS_TexturePrefetcher():
+
+    # Reads texture files on a small thread pool so that they are already in the OS
+    # page cache by the time the main thread loads them into Blender and Octane.
+    chunkSize = 1024 * 1024
+
+    def __init__(self, workers=4):
+        self.workers = workers
+        self.executor = None
+        self.lock = threading.Lock()
+
+    # Queue a file to be read and return a future of (bytes read, read time in seconds).
+    # With `hashContent` the content digest used by MS_ImageCache is computed on the way.
+    def Submit(self, path, hashContent=False):
+        with self.lock:
+            if self.executor is None:
+                self.executor = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="MSLiveLinkPrefetch")
+            return self.executor.submit(self.ReadFile, path, hashContent)
+
+    def ReadFile(self, path, hashContent=False):
+        readStart = time.perf_counter()
+        size = 0
+        chunk = bytearray(self.chunkSize)
+        sha1 = hashlib.sha1() if hashContent else None
+        with open(path, "rb", buffering=0) as f:
+            stat = os.fstat(f.fileno())
+            while True:
+                read = f.readinto(chunk)
+                if not read:
+                    break
+                size += read
+                if sha1 is not None:
+                    sha1.update(memoryview(chunk)[:read])
+        if sha1 is not None:
+            globals()['MG_ImageCache'].StoreDigest(path, stat, sha1.hexdigest())
+        return size, time.perf_counter() - readStart
+
+    def Shutdown(self):
+        with self.lock:
+            if self.executor is not None:
+                self.executor.shutdown(wait=False)
+                self.executor = None
+
+globals()['MG_TexturePrefetcher'] = MS_TexturePrefetcher()
+
+
+class MS_TextureConverter():
+
+    # Converts textures into tiled, mip-mapped files that Octane loads and streams faster:
+    # half-float EXR for displacement and 8-bit TIFF for every other map. Each conversion
+    # runs in its own maketx process, or through the OpenImageIO module when maketx isn't
+    # installed, started from a thread pool while the import goes on. Converted files are
+    # cached by the path, size and modification time of their source, in a folder next to
+    # the source like proxies and packed maps, so saved files keep finding them. When a
+    # shared cache folder is set, using a cached file refreshes its modification time and
+    # the least recently used files are deleted once the cache grows over its size limit.
+    # The cache lives in its own folderName subfolder, only files named like converted
+    # textures are deleted, and never the ones used by images of the open file.
+    folderName = ".mslivelink_textures"
+    tileSize = "64"
+    cachedName = re.compile(r'^.+_[0-9a-f]{16}\.(exr|tif)$')
+
+    swapInterval = 0.5
+
+    def __init__(self, workers=None):
+        self.workers = workers or max(1, (os.cpu_count() or 2) // 2)
+        self.executor = None
+        self.lock = threading.Lock()
+        self.tool = None
+        # (image name, source path, future) of the images loaded before their conversion was done.
+        self.pending = []
+        self.timer = None
+
+    # The shared cache folder, or None when textures are converted next to their source.
+    def CacheDir(self, prefs):
+        if prefs.conversion_cache_dir:
+            return os.path.join(bpy.path.abspath(prefs.conversion_cache_dir), self.folderName)
+        return None
+
+    # Path of maketx, "oiio" for the OpenImageIO module, or "" when neither is available.
+    def Tool(self):
+        if self.tool is None:
+            self.tool = shutil.which("maketx") or ""
+            if not self.tool:
+                try:
+                    import OpenImageIO
+                    self.tool = "oiio"
+                except ImportError:
+                    print("Megascans LiveLink: install OpenImageIO's maketx to convert textures")
+        return self.tool
+
+    def CachedPath(self, texPath, texType, cacheDir):
+        stat = os.stat(texPath)
+        isDisplacement = texType == "displacement"
+        key = [os.path.abspath(texPath), stat.st_size, stat.st_mtime_ns, isDisplacement]
+        digest = hashlib.sha1(json.dumps(key).encode()).hexdigest()[:16]
+        texName = os.path.splitext(os.path.basename(texPath))[0]
+        if cacheDir is None:
+            cacheDir = os.path.join(os.path.dirname(texPath), self.folderName)
+        return os.path.join(cacheDir, "%s_%s%s" % (texName, digest, ".exr" if isDisplacement else ".tif"))
+
+    # Queue the conversion of a texture and return a future of the path to load, or None
+    # when no conversion tool is available.
+    def Submit(self, texPath, texType, cacheDir):
+        if not self.Tool():
+            return None
+        with self.lock:
+            if self.executor is None:
+                self.executor = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="MSLiveLinkConvert")
+            return self.executor.submit(self.Convert, texPath, texType, cacheDir)
+
+    # Return the converted texture, or the source itself when it can't be converted.
+    def Convert(self, texPath, texType, cacheDir):
+        convertStart = time.perf_counter()
+        try:
+            cachedPath = self.CachedPath(texPath, texType, cacheDir)
+            if os.path.exists(cachedPath):
+                os.utime(cachedPath)
+                return cachedPath
+            os.makedirs(os.path.dirname(cachedPath), exist_ok=True)
+            # Written under a temporary name so a partial file is never used.
+            base, ext = os.path.splitext(cachedPath)
+            partialPath = "%s.part%d%s" % (base, threading.get_ident(), ext)
+            dataFormat = "half" if texType == "displacement" else "uint8"
+            if self.Tool() == "oiio":
+                import OpenImageIO as oiio
+                config = oiio.ImageSpec()
+                config.set_format(oiio.HALF if dataFormat == "half" else oiio.UINT8)
+                config.tile_width = config.tile_height = int(self.tileSize)
+                if not oiio.ImageBufAlgo.make_texture(oiio.MakeTxTexture, texPath, partialPath, config):
+                    raise RuntimeError(oiio.geterror())
+            else:
+                subprocess.run([self.Tool(), texPath, "-o", partialPath, "-d", dataFormat,
+                                "--tile", self.tileSize, self.tileSize],
+                               check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+            os.replace(partialPath, cachedPath)
+            globals()['MG_Telemetry'].Record("convert", convertStart, time.perf_counter() - convertStart)
+            return cachedPath
+        except Exception as e:
+            print("Megascans LiveLink Error converting " + texPath + ". Error: " + str(e))
+            return texPath
+
+    # Replace the image `imageName`, loaded from `texPath`, with the result of `conversion`
+    # once it is done. Only called from the main thread.
+    def Defer(self, imageName, texPath, conversion):
+        self.pending.append((imageName, texPath, conversion))
+        if self.timer is None or not bpy.app.timers.is_registered(self.timer):
+            self.timer = self.SwapConverted
+            bpy.app.timers.register(self.timer, first_interval=self.swapInterval)
+
+    # Timer relinking the nodes using a deferred image to its converted file, like
+    # MS_TextureProxies.SwapToFullResolution. With `wait`, e.g. in background mode where
+    # timers don't run, every pending conversion is waited for.
+    def SwapConverted(self, wait=False):
+        try:
+            ready = [entry for entry in self.pending if wait or entry[2].done()]
+            self.pending = [entry for entry in self.pending if entry not in ready]
+            converted = {}
+            for imageName, texPath, conversion in ready:
+                source = bpy.data.images.get(imageName)
+                loadPath = conversion.result()
+                if source is None or loadPath == texPath:
+                    continue
+                image = globals()['MG_ImageCache'].Load(loadPath)
+                image.colorspace_settings.name = source.colorspace_settings.name
+                image.alpha_mode = source.alpha_mode
+                converted[imageName] = image
+
+            if converted:
+                for mat in bpy.data.materials:
+                    if mat.node_tree is None:
+                        continue
+                    for node in mat.node_tree.nodes:
+                        image = getattr(node, "image", None)
+                        if image is not None and image.name in converted:
+                            node.image = converted[image.name]
+                for imageName in converted:
+                    source = bpy.data.images.get(imageName)
+                    if source is not None and source.users == 0:
+                        bpy.data.images.remove(source)
+        except Exception as e:
+            print("Megascans LiveLink Error swapping converted textures. Error: " + str(e))
+        if self.pending:
+            return self.swapInterval
+        self.timer = None
+        return None
+
+    def ScheduleEviction(self, cacheDir, limit):
+        # Read on the main thread, bpy can't be used from the pool.
+        used = set(os.path.normcase(os.path.abspath(bpy.path.abspath(image.filepath)))
+                   for image in bpy.data.images if image.filepath)
+        with self.lock:
+            if self.executor is not None:
+                self.executor.submit(self.Evict, cacheDir, limit, used)
+
+    # Delete the least recently used files until the cache is at most `limit` bytes,
+    # except the files in `used`.
+    def Evict(self, cacheDir, limit, used=()):
+        try:
+            entries = []
+            with os.scandir(cacheDir) as it:
+                for entry in it:
+                    if entry.is_file() and self.cachedName.match(entry.name):
+                        stat = entry.stat()
+                        entries.append((stat.st_mtime, stat.st_size, entry.path))
+            # Used files count towards the limit but are kept.
+            total = sum(size for mtime, size, path in entries)
+            for mtime, size, path in sorted(entries):
+                if total <= limit:
+                    break
+                if os.path.normcase(os.path.abspath(path)) in used:
+                    continue
+                os.remove(path)
+                total -= size
+        except Exception as e:
+            print("Megascans LiveLink Error evicting converted textures. Error: " + str(e))
 
-        # Create the cavity map setup
-        if ("cavity" in self.textureTypes) and (prefs.is_cavity_enabled):
-            imgPath = self.GetTexturePath("cavity")
-            if len(imgPath) >= 1:
-                texNode = self.nodes.new('ShaderNodeOctImageTex')
+    def Shutdown(self):
+        if self.timer is not None and bpy.app.timers.is_registered(self.timer):
+            bpy.app.timers.unregister(self.timer)
+        self.timer = None
+        self.pending = []
+        with self.lock:
+            if self.executor is not None:
+                self.executor.shutdown(wait=False)
+                self.executor = None
 
-                y_exp += -320
-                texNode.location = (-720, y_exp)
+globals()['MG_TextureConverter'] = MS_TextureConverter()
 
-                texNode.image = bpy.data.images.load(imgPath)
-                texNode.show_texture = True
-                texNode.image.colorspace_settings.name = self.colorSpaces[1]
 
-                # Link transform node
-                self.mat.node_tree.links.new(
-                    texNode.inputs['Transform'], transNode.outputs[0])
+class MS_DirectoryIndex():
 
-        # Create the cavity map setup
-        if ("curvature" in self.textureTypes) and (prefs.is_curvature_enabled):
-            imgPath = self.GetTexturePath("curvature")
-            if len(imgPath) >= 1:
-                texNode = self.nodes.new('ShaderNodeOctImageTex')
+    # Cached listings of asset folders, used to resolve texture and mesh variants without a
+    # stat call per candidate file, which is slow on network shares. A folder is listed with a
+    # single os.scandir and its listing is revalidated against the folder mtime at most once
+    # per batch (see NewBatch).
+    resolutionPattern = re.compile(r'(?<=_)(\d+)K(?=_)', re.IGNORECASE)
+    lodPattern = re.compile(r'^(.*)_LOD(\d+)$', re.IGNORECASE)
 
-                y_exp += -320
-                texNode.location = (-720, y_exp)
+    def __init__(self):
+        self.listings = {}
+        self.batch = 0
 
-                texNode.image = bpy.data.images.load(imgPath)
-                texNode.show_texture = True
-                texNode.image.colorspace_settings.name = self.colorSpaces[1]
+    def NewBatch(self):
+        self.batch += 1
 
-                # Link transform node
-                self.mat.node_tree.links.new(
-                    texNode.inputs['Transform'], transNode.outputs[0])
+    # Return a dict of normalized file names to file names for `directory`.
+    def Listing(self, directory):
+        cached = self.listings.get(directory)
+        if cached is not None and cached[1] == self.batch:
+            return cached[2]
+        try:
+            mtime = os.stat(directory).st_mtime_ns
+        except OSError:
+            self.listings.pop(directory, None)
+            return {}
+        if cached is not None and cached[0] == mtime:
+            self.listings[directory] = (mtime, self.batch, cached[2])
+            return cached[2]
+        with os.scandir(directory) as entries:
+            files = {os.path.normcase(entry.name): entry.name for entry in entries if entry.is_file()}
+        self.listings[directory] = (mtime, self.batch, files)
+        return files
+
+    def Find(self, directory, fileName):
+        return self.Listing(directory).get(os.path.normcase(fileName))
+
+    # Return the (format, path) to use for a texture: the EXR sibling for displacement and,
+    # optionally, the highest resolution available in the folder.
+    def ResolveTexture(self, texPath, texType, texFormat, preferHighestResolution=False):
+        texDir, fileName = os.path.split(texPath)
+        texName, texExt = os.path.splitext(fileName)
+
+        if preferHighestResolution:
+            texName = self.HighestResolution(texDir, texName, texExt)
+
+        if texType == "displacement" and texFormat != "exr":
+            exrName = self.Find(texDir, texName + ".exr")
+            if exrName is not None:
+                return "exr", os.path.join(texDir, exrName)
+
+        resolved = self.Find(texDir, texName + texExt)
+        if resolved is None:
+            return texFormat, texPath
+        return texFormat, os.path.join(texDir, resolved)
+
+    def HighestResolution(self, texDir, texName, texExt):
+        match = self.resolutionPattern.search(texName)
+        if match is None:
+            return texName
+        best, bestResolution = texName, int(match.group(1))
+        prefix, suffix = texName[:match.start()], texName[match.end():]
+        for name in self.Listing(texDir).values():
+            stem, ext = os.path.splitext(name)
+            if os.path.normcase(ext) != os.path.normcase(texExt):
+                continue
+            other = self.resolutionPattern.search(stem)
+            if other is None or stem[:other.start()] != prefix or stem[other.end():] != suffix:
+                continue
+            if int(other.group(1)) > bestResolution:
+                best, bestResolution = stem, int(other.group(1))
+        return best
+
+    # Return the paths of every LOD of the mesh at `meshPath` found in its folder, ordered
+    # from LOD0 down. A mesh without a LOD suffix is returned on its own.
+    def LODFiles(self, meshPath):
+        meshDir, fileName = os.path.split(meshPath)
+        meshName, meshExt = os.path.splitext(fileName)
+        match = self.lodPattern.match(meshName)
+        if match is None:
+            return [meshPath]
+        lods = []
+        for name in self.Listing(meshDir).values():
+            stem, ext = os.path.splitext(name)
+            other = self.lodPattern.match(stem)
+            if other is not None and other.group(1) == match.group(1) and os.path.normcase(ext) == os.path.normcase(meshExt):
+                lods.append((int(other.group(2)), os.path.join(meshDir, name)))
+        return [path for lod, path in sorted(lods)] or [meshPath]
+
+    def Clear(self):
+        self.listings.clear()
+
+globals()['MG_DirectoryIndex'] = MS_DirectoryIndex()
+
+
+class MS_TextureProxies():
+
+    # Downscaled copies of textures used when a maximum texture resolution is set. Proxies
+    # are written to a folder next to the asset and regenerated when the source changes.
+    # OpenImageIO is used when it is available, Blender's own image scaling otherwise.
+    # Proxy images keep the path of their source in a custom property so they can be
+    # swapped back to full resolution (see MS_Swap_FullRes).
+    folderName = ".mslivelink_proxies"
+    fullResKey = "ms_fullres_path"
 
-        # Create the fuzziness setup.
-        if ("fuzz" in self.textureTypes) and (prefs.is_fuze_enabled):
-            imgPath = self.GetTexturePath('fuze')
-            if len(imgPath) >= 1:
-                texNode = nodes.new('ShaderNodeOctImageTex')
+    def __init__(self):
+        # Sources already known to fit within a resolution, keyed by (path, mtime, resolution).
+        self.smallSources = set()
+
+    def ProxyPath(self, imgPath, maxResolution):
+        texDir, fileName = os.path.split(imgPath)
+        texName, texExt = os.path.splitext(fileName)
+        return os.path.join(texDir, self.folderName, "%s_%dpx%s" % (texName, maxResolution, texExt))
+
+    # Return the path to load for `imgPath`: the source itself when it fits within
+    # `maxResolution`, its proxy otherwise.
+    def Get(self, imgPath, maxResolution):
+        proxyPath = self.ProxyPath(imgPath, maxResolution)
+        try:
+            sourceTime = os.stat(imgPath).st_mtime_ns
+            key = (imgPath, sourceTime, maxResolution)
+            if key in self.smallSources:
+                return imgPath
+            if os.path.exists(proxyPath) and os.stat(proxyPath).st_mtime_ns >= sourceTime:
+                return proxyPath
+            os.makedirs(os.path.dirname(proxyPath), exist_ok=True)
+            if self.Generate(imgPath, proxyPath, maxResolution):
+                return proxyPath
+            self.smallSources.add(key)
+        except Exception as e:
+            print("Megascans LiveLink Error creating a texture proxy for " + imgPath + ". Error: " + str(e))
+        return imgPath
 
-                y_exp += -320
-                texNode.location = (-720, y_exp)
+    def ProxySize(self, width, height, maxResolution):
+        scale = maxResolution / float(max(width, height))
+        if scale >= 1:
+            return None
+        return max(1, int(round(width * scale))), max(1, int(round(height * scale)))
 
-                texNode.image = bpy.data.images.load(imgPath)
-                texNode.show_texture = True
-                texNode.image.colorspace_settings.name = self.colorSpaces[1]
+    # Write the proxy and return True, or return False when the source is small enough.
+    def Generate(self, imgPath, proxyPath, maxResolution):
+        try:
+            import OpenImageIO as oiio
+        except ImportError:
+            oiio = None
+
+        if oiio is not None:
+            source = oiio.ImageBuf(imgPath)
+            spec = source.spec()
+            size = self.ProxySize(spec.width, spec.height, maxResolution)
+            if size is None:
+                return False
+            roi = oiio.ROI(0, size[0], 0, size[1], 0, 1, 0, spec.nchannels)
+            proxy = oiio.ImageBufAlgo.resize(source, roi=roi)
+            if not proxy.write(proxyPath):
+                raise RuntimeError(proxy.geterror())
+            return True
 
-                # Link transform node
-                self.mat.node_tree.links.new(
-                    texNode.inputs['Transform'], transNode.outputs[0])
+        image = bpy.data.images.load(imgPath)
+        try:
+            size = self.ProxySize(image.size[0], image.size[1], maxResolution)
+            if size is None:
+                return False
+            image.scale(size[0], size[1])
+            image.filepath_raw = proxyPath
+            image.save()
+            return True
+        finally:
+            bpy.data.images.remove(image)
+
+    # Relink every image node using a proxy to the full resolution texture and return
+    # the number of nodes changed. Proxies left without users are removed.
+    def SwapToFullResolution(self):
+        fullImages = {}
+        for image in list(bpy.data.images):
+            fullPath = image.get(self.fullResKey)
+            if fullPath:
+                fullImage = globals()['MG_ImageCache'].Load(fullPath)
+                fullImage.colorspace_settings.name = image.colorspace_settings.name
+                fullImage.alpha_mode = image.alpha_mode
+                fullImages[image.name] = fullImage
+
+        swapped = 0
+        for mat in bpy.data.materials:
+            if mat.node_tree is None:
+                continue
+            for node in mat.node_tree.nodes:
+                image = getattr(node, "image", None)
+                if image is not None and image.name in fullImages:
+                    node.image = fullImages[image.name]
+                    swapped += 1
+
+        for name in fullImages:
+            proxy = bpy.data.images.get(name)
+            if proxy is not None and proxy.users == 0:
+                bpy.data.images.remove(proxy)
+        return swapped
+
+globals()['MG_TextureProxies'] = MS_TextureProxies()
+
+
+class MS_MeshCache():
+
+    # Remembers the objects created by importing a set of mesh files, keyed by the files'
+    # paths and modification times. Importing the same files again creates linked
+    # duplicates that share the already imported mesh datablocks, so repeated assets are
+    # neither parsed again nor duplicated in memory, and Octane exports them as instances.
+    # Objects are stored by name and identity, so renamed objects or objects of another
+    # file with the same name are never reused. The cache is cleared when a file is opened.
+    def __init__(self):
+        self.objects = {}
+        self.reused = 0
+        self.verticesShared = 0
+        self.bytesSkipped = 0
 
-        # Deselect all nodes
-        for node in self.nodes:
-            node.select = False
+    def Key(self, meshPaths):
+        try:
+            return tuple((os.path.normcase(os.path.abspath(path)), os.stat(path).st_mtime_ns)
+                         for path in sorted(meshPaths))
+        except OSError:
+            return None
+
+    # session_uid is unique for the whole session, as_pointer only while the object exists.
+    @staticmethod
+    def Identity(obj):
+        return getattr(obj, "session_uid", None) or obj.as_pointer()
+
+    # Return the objects imported for `key`, or None when any of them has been deleted,
+    # renamed or replaced.
+    def Get(self, key):
+        entries = self.objects.get(key)
+        if not entries:
+            return None
+        objects = [bpy.data.objects.get(name) for name, identity in entries]
+        if any(obj is None or self.Identity(obj) != identity for obj, (name, identity) in zip(objects, entries)):
+            del self.objects[key]
+            return None
+        self.reused += 1
+        self.bytesSkipped += sum(os.path.getsize(path) for path, mtime in key)
+        return objects
+
+    def Add(self, key, objects):
+        if objects:
+            self.objects[key] = [(obj.name, self.Identity(obj)) for obj in objects]
+
+    # Create linked duplicates of `objects`, keeping their hierarchy. Material slots of the
+    # duplicates are linked to the object so assigning a material doesn't change the shared mesh.
+    def Duplicate(self, objects):
+        duplicates = {}
+        collection = bpy.context.collection
+        for obj in objects:
+            duplicate = obj.copy()
+            collection.objects.link(duplicate)
+            for slot in duplicate.material_slots:
+                slot.link = 'OBJECT'
+            if obj.type == 'MESH':
+                self.verticesShared += len(obj.data.vertices)
+            duplicates[obj] = duplicate
+        for obj, duplicate in duplicates.items():
+            if obj.parent in duplicates:
+                duplicate.parent = duplicates[obj.parent]
+        print("Megascans LiveLink mesh cache: reused meshes %d times so far, sharing %d vertices and skipping %.1f MB of mesh files" % (
+            self.reused, self.verticesShared, self.bytesSkipped / 1048576.0))
+        return list(duplicates.values())
+
+    def Clear(self):
+        self.objects.clear()
+
+globals()['MG_MeshCache'] = MS_MeshCache()
+
+
+class MS_ImageCache():
+
+    # Reuses image datablocks for textures that were already loaded, so re-importing an
+    # asset or importing assets that share a texture set doesn't create foo.001, foo.002...
+    # Images are keyed by normalized path, modification time and size, or by a hash of
+    # their content when matching identical files stored at different paths. Entries hold
+    # the image name and the file it was loaded from, and a hit is only used when the image
+    # of that name still points to that file. The cache is cleared when a file is opened.
+    def __init__(self):
+        self.images = {}
+        self.pathKeys = {}
+        self.reused = 0
+        self.bytesSaved = 0
+        self.reportedReused = 0
+        # Content digests by (normalized path, modification time, size), which outlive the
+        # open file. They are also filled by MS_TexturePrefetcher while it reads the files.
+        self.digests = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def NormalizePath(path):
+        return os.path.normcase(os.path.abspath(path))
+
+    def StoreDigest(self, imgPath, stat, digest):
+        with self.lock:
+            self.digests[(self.NormalizePath(imgPath), stat.st_mtime_ns, stat.st_size)] = digest
+
+    def Digest(self, imgPath, stat):
+        with self.lock:
+            digest = self.digests.get((self.NormalizePath(imgPath), stat.st_mtime_ns, stat.st_size))
+        if digest is None:
+            sha1 = hashlib.sha1()
+            with open(imgPath, "rb") as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                    sha1.update(chunk)
+            digest = sha1.hexdigest()
+            self.StoreDigest(imgPath, stat, digest)
+        return digest
+
+    def Key(self, imgPath, useHash):
+        stat = os.stat(imgPath)
+        if useHash:
+            return (self.Digest(imgPath, stat), stat.st_size), stat.st_size
+        return (self.NormalizePath(imgPath), stat.st_mtime_ns, stat.st_size), stat.st_size
+
+    def Load(self, imgPath, useHash=False):
+        try:
+            key, size = self.Key(imgPath, useHash)
+        except OSError:
+            return bpy.data.images.load(imgPath, check_existing=True)
+
+        entry = self.images.get(key)
+        if entry is not None:
+            name, loadedPath = entry
+            image = bpy.data.images.get(name)
+            if image is not None and self.NormalizePath(bpy.path.abspath(image.filepath)) == loadedPath:
+                self.reused += 1
+                self.bytesSaved += size
+                return image
+
+        image = bpy.data.images.load(imgPath, check_existing=True)
+        # The file changed on disk since it was last loaded, refresh the existing datablock.
+        path = self.NormalizePath(imgPath)
+        if self.pathKeys.get(path, key) != key:
+            image.reload()
+        self.pathKeys[path] = key
+        self.images[key] = (image.name, path)
+        return image
+
+    def Report(self):
+        if self.reused > self.reportedReused:
+            print("Megascans LiveLink image cache: reused %d images so far, saved %.1f MB of duplicate textures" % (
+                self.reused, self.bytesSaved / 1048576.0))
+            self.reportedReused = self.reused
+
+    def Clear(self):
+        self.images.clear()
+        self.pathKeys.clear()
+
+globals()['MG_ImageCache'] = MS_ImageCache()
+
+
+class MS_MaterialRegistry():
+
+    # Maps material fingerprints (see MS_Init_ImportProcess.MaterialFingerprint) to the
+    # materials built for them. The fingerprint is also stored on the material itself, so
+    # materials from a previously saved file are picked up the first time they are needed.
+    # The registry is cleared whenever a file is opened, so the new file is indexed again.
+    fingerprintKey = "ms_fingerprint"
 
-        # End of material setup
+    def __init__(self):
+        self.materials = {}
+        self.indexed = False
+
+    def Index(self):
+        for mat in bpy.data.materials:
+            fingerprint = mat.get(self.fingerprintKey)
+            if fingerprint is not None:
+                self.materials.setdefault(fingerprint, mat.name)
+        self.indexed = True
+
+    def Get(self, fingerprint):
+        if not self.indexed:
+            self.Index()
+        name = self.materials.get(fingerprint)
+        if name is not None:
+            mat = bpy.data.materials.get(name)
+            if mat is not None and mat.get(self.fingerprintKey) == fingerprint:
+                return mat
+            del self.materials[fingerprint]
+        return None
+
+    def Add(self, fingerprint, mat):
+        self.materials[fingerprint] = mat.name
+
+    def Clear(self):
+        self.materials.clear()
+        self.indexed = False
+
+globals()['MG_MaterialRegistry'] = MS_MaterialRegistry()
+
+
+class MS_ChannelPacker():
+
+    # Packs single channel maps of an asset into the channels of one RGBA image, read back
+    # with Octane channel picker nodes, so fewer images are loaded and uploaded to Octane.
+    # Packed images are written to a folder next to the asset and named after the paths and
+    # modification times of their sources, so changed sources are packed again. Packing
+    # needs NumPy, which ships with Blender, and Octane's channel picker node.
+    # With the OpenImageIO module the files are read and written in a thread pool while the
+    # geometry is imported. Otherwise the maps are read through bpy, which only works on the
+    # main thread, and Blender stalls while a group is packed, up to seconds for 8K maps.
+    folderName = ".mslivelink_packed"
+    pickerNode = 'ShaderNodeOctChannelPickerTex'
+    pickerChannels = ("R", "G", "B", "A")
+    # Maps packed together, in channel order. Missing maps leave their channel empty.
+    groups = [("roughness", "metalness", "ao", "opacity"),
+              ("cavity", "curvature")]
+
+    def __init__(self, workers=2):
+        self.workers = workers
+        self.executor = None
+        self.lock = threading.Lock()
+
+    def IsAvailable(self):
+        try:
+            import numpy
+        except ImportError:
+            return False
+        return hasattr(bpy.types, self.pickerNode)
 
-    def GetTexturePath(self, textureType):
-        for item in self.textureList:
-            if item[1] == textureType:
-                return item[2].replace("\\", "/")
+    def HasOpenImageIO(self):
+        try:
+            import OpenImageIO
+        except ImportError:
+            return False
+        return True
+
+    def PackedPath(self, sources):
+        key = [(source, os.stat(source).st_mtime_ns) if source else None for source in sources]
+        digest = hashlib.sha1(json.dumps(key).encode()).hexdigest()
+        texDir = os.path.dirname(next(source for source in sources if source))
+        return os.path.join(texDir, self.folderName, digest + ".png")
+
+    # Start packing `sources` (one path or None per channel) and return a future of the
+    # packed image path, which is None if packing fails. Returns None when packing isn't possible.
+    def Submit(self, sources):
+        if not self.IsAvailable():
+            return None
+        if not self.HasOpenImageIO():
+            future = concurrent.futures.Future()
+            future.set_result(self.Get(sources))
+            return future
+        with self.lock:
+            if self.executor is None:
+                self.executor = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="MSLiveLinkPack")
+            return self.executor.submit(self.Get, sources)
+
+    # Return the packed image of `sources`, packing it unless it exists, or None on failure.
+    def Get(self, sources):
+        packStart = time.perf_counter()
+        try:
+            packedPath = self.PackedPath(sources)
+            if not os.path.exists(packedPath):
+                os.makedirs(os.path.dirname(packedPath), exist_ok=True)
+                # Written under a temporary name so a partial file is never used.
+                partialPath = "%s.part%d.png" % (os.path.splitext(packedPath)[0], threading.get_ident())
+                if self.HasOpenImageIO():
+                    self.GenerateFile(sources, partialPath)
+                else:
+                    self.Generate(sources, partialPath)
+                os.replace(partialPath, packedPath)
+                globals()['MG_Telemetry'].Record("pack", packStart, time.perf_counter() - packStart)
+            return packedPath
+        except Exception as e:
+            print("Megascans LiveLink Error channel packing " + ", ".join(s for s in sources if s) + ". Error: " + str(e))
+            return None
+
+    # Pack with OpenImageIO, without touching bpy, so it can run in any thread. The pixel
+    # values are read as stored in the files, like Non-Color images in Blender.
+    def GenerateFile(self, sources, packedPath):
+        import numpy
+        import OpenImageIO as oiio
+
+        config = oiio.ImageSpec()
+        config.attribute("oiio:UnassociatedAlpha", 1)
+        packed = None
+        for channel, source in enumerate(sources):
+            if not source:
+                continue
+            buf = oiio.ImageBuf(source, 0, 0, config)
+            if packed is None:
+                width, height = buf.spec().width, buf.spec().height
+                packed = numpy.zeros((height, width, 4), dtype=numpy.float32)
+                # Opaque where there is no opacity map.
+                packed[:, :, 3] = 1.0
+            elif (buf.spec().width, buf.spec().height) != (width, height):
+                buf = oiio.ImageBufAlgo.resize(buf, roi=oiio.ROI(0, width, 0, height, 0, 1, 0, buf.nchannels))
+            pixels = buf.get_pixels(oiio.FLOAT)
+            if buf.has_error:
+                raise RuntimeError(buf.geterror())
+            packed[:, :, channel] = pixels.reshape(height, width, -1)[:, :, 0]
+
+        spec = oiio.ImageSpec(width, height, 4, oiio.UINT8)
+        spec.attribute("oiio:UnassociatedAlpha", 1)
+        output = oiio.ImageOutput.create(packedPath)
+        if output is None:
+            raise RuntimeError(oiio.geterror())
+        try:
+            if not output.open(packedPath, spec) or not output.write_image(packed):
+                raise RuntimeError(output.geterror())
+        finally:
+            output.close()
+
+    # Pack through bpy, on the main thread only.
+    def Generate(self, sources, packedPath):
+        import numpy
+
+        packed = None
+        for channel, source in enumerate(sources):
+            if not source:
+                continue
+            image = bpy.data.images.load(source)
+            try:
+                # Read the stored values, without the sRGB to linear conversion.
+                image.colorspace_settings.name = 'Non-Color'
+                if packed is None:
+                    width, height = image.size
+                    packed = numpy.zeros((width * height, 4), dtype=numpy.float32)
+                    # Opaque where there is no opacity map.
+                    packed[:, 3] = 1.0
+                elif tuple(image.size) != (width, height):
+                    image.scale(width, height)
+                pixels = numpy.empty(width * height * 4, dtype=numpy.float32)
+                image.pixels.foreach_get(pixels)
+                packed[:, channel] = pixels[0::4]
+            finally:
+                bpy.data.images.remove(image)
+
+        image = bpy.data.images.new(os.path.basename(packedPath), width, height, alpha=True)
+        try:
+            image.alpha_mode = 'CHANNEL_PACKED'
+            image.pixels.foreach_set(packed.ravel())
+            image.filepath_raw = packedPath
+            image.file_format = 'PNG'
+            image.save()
+        finally:
+            bpy.data.images.remove(image)
+
+    def Shutdown(self):
+        with self.lock:
+            if self.executor is not None:
+                self.executor.shutdown(wait=False)
+                self.executor = None
+
+globals()['MG_ChannelPacker'] = MS_ChannelPacker()
+
+
+class MS_MaterialTemplates():
+
+    # Copies of built materials without images, named after the signature of their node
+    # setup (see MS_Init_ImportProcess.TemplateSignature). New materials with the same maps
+    # are made with Material.copy(), which duplicates the node tree in one call instead of
+    # creating every node and link through Python.
+    namePrefix = ".MS_Template_"
+    nodePrefix = "MS_"
+
+    def Get(self, signature):
+        return bpy.data.materials.get(self.namePrefix + signature)
+
+    def Add(self, signature, mat):
+        if self.Get(signature) is not None:
+            return
+        template = mat.copy()
+        template.name = self.namePrefix + signature
+        if MS_MaterialRegistry.fingerprintKey in template:
+            del template[MS_MaterialRegistry.fingerprintKey]
+        # The template must not keep the images of the asset it was made from.
+        for node in template.node_tree.nodes:
+            if node.name.startswith(self.nodePrefix) and hasattr(node, "image"):
+                node.image = None
+
+globals()['MG_MaterialTemplates'] = MS_MaterialTemplates()
+
+
+class MS_LazyMaterials():
+
+    # Placeholder materials of the lazy mode carry the textures of their asset under
+    # manifestKey. A timer builds the node setup of the placeholders used by visible
+    # objects while a 3D viewport is in rendered shading, a few per tick, and stops once
+    # no placeholder is left. RealizeAll builds every placeholder, e.g. before a final render.
+    manifestKey = "ms_manifest"
+    interval = 0.5
+    budget = 0.05
 
+    def __init__(self):
+        self.timer = None
+
+    def Placeholders(self):
+        return [mat for mat in bpy.data.materials if self.manifestKey in mat]
+
+    # Build the given placeholders with a single builder, until `deadline` if one is given.
+    def Realize(self, materials, deadline=None):
+        if not materials:
+            return 0
+        builder = MS_Init_ImportProcess.MaterialBuilder()
+        for mat in materials:
+            try:
+                builder.RealizeMaterial(mat)
+            except Exception as e:
+                print("Megascans LiveLink Error realizing material " + mat.name + ". Error: ", str(e))
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+        globals()['MG_ImageCache'].Report()
+        return builder.operationCounts["realized materials"]
+
+    def RealizeAll(self):
+        return self.Realize(self.Placeholders())
+
+    def IsRunning(self):
+        return self.timer is not None and bpy.app.timers.is_registered(self.timer)
+
+    def Watch(self):
+        if not self.IsRunning():
+            self.timer = self.Update
+            bpy.app.timers.register(self.timer, first_interval=self.interval)
+
+    def Stop(self):
+        if self.IsRunning():
+            bpy.app.timers.unregister(self.timer)
+        self.timer = None
+
+    def Update(self):
+        try:
+            if not self.Placeholders():
+                self.timer = None
+                return None
+            if self.IsRenderedViewportOpen():
+                self.Realize(self.VisiblePlaceholders(), time.perf_counter() + self.budget)
+        except Exception as e:
+            print("Megascans LiveLink Error realizing materials. Error: ", str(e))
+        return self.interval
+
+    def IsRenderedViewportOpen(self):
+        for window in bpy.context.window_manager.windows:
+            for area in window.screen.areas:
+                if area.type == 'VIEW_3D' and area.spaces.active.shading.type == 'RENDERED':
+                    return True
+        return False
 
-class ms_Init(threading.Thread):
+    def VisiblePlaceholders(self):
+        placeholders = []
+        for obj in bpy.context.view_layer.objects:
+            if not obj.visible_get():
+                continue
+            for slot in obj.material_slots:
+                mat = slot.material
+                if mat is not None and self.manifestKey in mat and mat not in placeholders:
+                    placeholders.append(mat)
+        return placeholders
 
-        # Initialize the thread and assign the method (i.e. importer) to be called when it receives JSON data.
-    def __init__(self, importer):
-        threading.Thread.__init__(self)
-        self.importer = importer
+globals()['MG_LazyMaterials'] = MS_LazyMaterials()
 
-        # Start the thread to start listing to the port.
-    def run(self):
-        try:
-            run_livelink = True
-            host, port = 'localhost', 28888
-            # Making a socket object.
-            socket_ = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            # Binding the socket to host and port number mentioned at the start.
-            socket_.bind((host, port))
 
-            # Run until the thread starts receiving data.
-            while run_livelink:
-                socket_.listen(5)
-                # Accept connection request.
-                client, addr = socket_.accept()
-                data = ""
-                buffer_size = 4096*2
-                # Receive data from the client.
-                data = client.recv(buffer_size)
-                if data == b'Bye Megascans':
-                    run_livelink = False
-                    break
+class MS_Telemetry():
+
+    # Ring buffer of the most recent timing spans of LiveLink, recorded by the listener
+    # thread (receive) and the import (decode, parse, resolve, geometry, material,
+    # images.load, material build, node links, link, alembic). Spans are (name, start,
+    # duration, thread) with times in seconds from time.perf_counter.
+    capacity = 20000
+
+    def __init__(self):
+        self.enabled = True
+        self.lock = threading.Lock()
+        self.spans = collections.deque(maxlen=self.capacity)
+        self.origin = time.perf_counter()
+
+    def Record(self, name, start, duration):
+        if self.enabled:
+            with self.lock:
+                self.spans.append((name, start, duration, threading.get_ident()))
+
+    def Spans(self):
+        with self.lock:
+            return list(self.spans)
+
+    # Count, total, median and 95th percentile duration of every phase.
+    def Summary(self):
+        durations = collections.defaultdict(list)
+        for name, start, duration, thread in self.Spans():
+            durations[name].append(duration)
+        summary = {}
+        for name, values in durations.items():
+            values.sort()
+            summary[name] = {"count": len(values), "total": sum(values),
+                             "p50": self.Percentile(values, 50), "p95": self.Percentile(values, 95)}
+        return summary
+
+    @staticmethod
+    def Percentile(values, percent):
+        return values[min(len(values) - 1, len(values) * percent // 100)]
+
+    # Write the spans in the Trace Event Format read by chrome://tracing and Perfetto.
+    def ExportChromeTrace(self, path):
+        pid = os.getpid()
+        events = [{"name": name, "cat": "mslivelink", "ph": "X", "pid": pid, "tid": thread,
+                   "ts": (start - self.origin) * 1e6, "dur": duration * 1e6}
+                  for name, start, duration, thread in self.Spans()]
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+        return len(events)
+
+    def ExportCSV(self, path):
+        spans = self.Spans()
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["phase", "start_ms", "duration_ms", "thread"])
+            for name, start, duration, thread in spans:
+                writer.writerow([name, "%.3f" % ((start - self.origin) * 1000), "%.3f" % (duration * 1000), thread])
+        return len(spans)
+
+    def Clear(self):
+        with self.lock:
+            self.spans.clear()
+
+globals()['MG_Telemetry'] = MS_Telemetry()
+
+
+class MS_ImportScheduler():
+
+    # Runs MS_Init_ImportProcess jobs on the main thread a time slice at a time and
+    # reports their progress through the window manager progress indicator.
+
+    # Timer intervals in seconds. The timer polls at busyInterval while the queue drains,
+    # drops back to activeInterval whenever the receiver signals activity and doubles up to
+    # idleInterval otherwise. bpy timers cannot be woken from another thread, so
+    # idleInterval is the worst case delay between a payload arriving and its import.
+    busyInterval = 0.0
+    activeInterval = 0.005
+    idleInterval = 0.04
 
-                # If any data is received over the port.
-                if data != "":
-                    self.TotalData = b""
-                    # Append the previously received data to the Total Data.
-                    self.TotalData += data
-                    # Keep running until the connection is open and we are receiving data.
-                    while run_livelink:
-                        # Keep receiving data from client.
-                        data = client.recv(4096*2)
-                        if data == b'Bye Megascans':
-                            run_livelink = False
-                            break
-                        # if we are getting data keep appending it to the Total data.
-                        if data:
-                            self.TotalData += data
-                        else:
-                            # Once the data transmission is over call the importer method and send the collected TotalData.
-                            self.importer(self.TotalData)
-                            break
+    def __init__(self):
+        self.jobs = collections.deque()
+        self.progressTotal = None
+        self.timeBudget = 0.05
+        self.timerInterval = self.activeInterval
+
+    # Set the time slice in seconds given to the import on every timer tick.
+    def Configure(self, timeBudget):
+        self.timeBudget = timeBudget
+        self.timerInterval = self.activeInterval
+
+    # Timer of the LiveLink listener: feeds the payloads received from Bridge to the import.
+    def newDataMonitor(self):
+        try:
+            importQueue = globals()['MG_ImportQueue']
+            if importQueue.activity.is_set():
+                importQueue.activity.clear()
+                self.timerInterval = self.activeInterval
+            else:
+                self.timerInterval = min(self.timerInterval * 2, self.idleInterval)
+
+            # Only take the next payloads once the previous import is done, so a full
+            # queue keeps applying backpressure on the receiver.
+            if not self.IsBusy():
+                payloads = importQueue.Get()
+                if payloads:
+                    self.Add(MS_Init_ImportProcess(payloads))
+
+            # Import for one time slice per tick so the UI gets to redraw in between.
+            if self.IsBusy():
+                for job in self.Run(self.timeBudget):
+                    importQueue.MarkProcessed(len(job.payloads))
+                self.timerInterval = self.activeInterval
+                if self.IsBusy() or len(importQueue) > 0:
+                    return self.busyInterval
         except Exception as e:
-            print("Megascans LiveLink Error initializing the thread. Error: " + str(e))
+            print(
+                "Megascans LiveLink error starting blender plugin (newDataMonitor). Error: ", str(e))
+            # Keep the timer registered so the next payloads are still imported.
+            return self.idleInterval
+        return self.timerInterval
+
+    def Add(self, job):
+        self.jobs.append(job)
+
+    def IsBusy(self):
+        return len(self.jobs) > 0
+
+    # Advance the pending jobs for at most `budget` seconds and return the finished ones.
+    def Run(self, budget):
+        finished = []
+        deadline = time.perf_counter() + budget
+        while self.jobs:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            if not self.jobs[0].Run(remaining):
+                break
+            finished.append(self.jobs.popleft())
+        self.UpdateProgress()
+        return finished
+
+    def UpdateProgress(self):
+        try:
+            wm = bpy.context.window_manager
+            if not self.jobs:
+                if self.progressTotal is not None:
+                    wm.progress_end()
+                    self.progressTotal = None
+                return
+            total = sum(job.stepCount for job in self.jobs)
+            if total != self.progressTotal:
+                wm.progress_begin(0, total)
+                self.progressTotal = total
+            wm.progress_update(sum(job.stepsDone for job in self.jobs))
+        except Exception as e:
+            print("Megascans LiveLink Error updating the import progress. Error: ", str(e))
+
+globals()['MG_ImportScheduler'] = MS_ImportScheduler()
+
+
+class MS_ReceiveBuffer():
+
+    # Growable receive buffer for one Bridge connection. Data is received in place with
+    # recv_into and the capacity doubles when full, so assembling a payload is linear
+    # in its size instead of copying the whole buffer on every chunk.
+    def __init__(self, size, parser=None):
+        self.data = bytearray(size)
+        self.length = 0
+        # Optional MS_StreamParser splitting the data into assets while it arrives.
+        self.parser = parser
+        # Whether the peer speaks the framed protocol, None until the first bytes are known.
+        self.framed = None
+        self.framesReceived = 0
+        # Start of the message being received, for the receive telemetry.
+        self.receiveStart = time.perf_counter()
+
+    # Return a writable view on at least `size` free bytes at the end of the buffer.
+    # The view must be released before the buffer can grow again.
+    def Reserve(self, size):
+        free = len(self.data) - self.length
+        if free < size:
+            self.data.extend(bytes(max(len(self.data), size - free)))
+        return memoryview(self.data)[self.length:]
+
+    def IsShutdownMessage(self):
+        return self.length == 13 and self.data[:13] == b'Bye Megascans'
+
+    # Trim the unused capacity in place and return the payload. json.loads accepts the
+    # bytearray directly, so no extra copy of the data is made.
+    def Payload(self):
+        del self.data[self.length:]
+        return self.data
+
+    # Drop the first `size` bytes once they have been consumed.
+    def Discard(self, size):
+        del self.data[:size]
+        self.length -= size
+
+
+class MS_FramedProtocol():
+
+    # Optional framed protocol on the LiveLink port. A connection that starts with `magic`
+    # stays open for any number of messages, each made of a header (message type and
+    # payload length) followed by the payload. The listener acks every message with the
+    # sequence number of the message on that connection and closes the connection on a
+    # message type it doesn't know. Connections that don't start with `magic` use the
+    # original protocol: one payload delimited by the peer closing the socket.
+    magic = b'MSLL'
+    header = struct.Struct('!BI')
+    DATA = 1
+    BYE = 2
+    ACK = 3
+
+    @classmethod
+    def Pack(cls, messageType, payload=b''):
+        return cls.header.pack(messageType, len(payload)) + payload
+
+    # Return True, False or None (not enough data yet) depending on whether the buffered
+    # data starts with the magic bytes. The magic bytes are consumed when found.
+    @classmethod
+    def Detect(cls, receiveBuffer):
+        size = min(receiveBuffer.length, len(cls.magic))
+        if receiveBuffer.data[:size] != cls.magic[:size]:
+            return False
+        if size < len(cls.magic):
+            return None
+        receiveBuffer.Discard(size)
+        return True
+
+    # Remove the complete messages from the buffer and return them as (type, payload).
+    @classmethod
+    def Unpack(cls, receiveBuffer):
+        messages = []
+        offset = 0
+        data = receiveBuffer.data
+        while receiveBuffer.length - offset >= cls.header.size:
+            messageType, size = cls.header.unpack_from(data, offset)
+            end = offset + cls.header.size + size
+            if end > receiveBuffer.length:
+                break
+            messages.append((messageType, bytes(data[offset + cls.header.size:end])))
+            offset = end
+        if offset:
+            receiveBuffer.Discard(offset)
+        return messages
+
+
+class MS_StreamParser():
+
+    # Splits the top-level JSON array sent by Bridge into assets as soon as the closing
+    # brace of each one arrives, so the first asset can be imported while the others are
+    # still streaming in. Only the structural characters are scanned and the string and
+    # escape state is kept between chunks. Consumed bytes are dropped from the receive
+    # buffer, so memory stays proportional to one asset rather than the whole payload.
+    tokens = re.compile(rb'[\[\]{}"\\]')
+
+    def __init__(self):
+        self.pos = 0
+        self.depth = 0
+        self.isArray = False
+        self.inString = False
+        self.escapePending = False
+        self.start = None
+        self.emitted = 0
+
+    # Scan the bytes received since the last call and return the completed assets.
+    def Feed(self, receiveBuffer):
+        data = receiveBuffer.data
+        end = receiveBuffer.length
+        pos = self.pos
+        assets = []
+
+        if self.escapePending and pos < end:
+            pos += 1
+            self.escapePending = False
+
+        while pos < end:
+            match = self.tokens.search(data, pos, end)
+            if match is None:
+                pos = end
+                break
+            index = match.start()
+            char = data[index]
+            pos = index + 1
+
+            if self.inString:
+                if char == 0x5c:  # backslash, skip the escaped character
+                    if pos < end:
+                        pos += 1
+                    else:
+                        self.escapePending = True
+                elif char == 0x22:  # closing quote
+                    self.inString = False
+            elif char == 0x22:
+                self.inString = True
+            elif char == 0x5b or char == 0x7b:  # [ or {
+                if self.depth == 0:
+                    self.isArray = char == 0x5b
+                    if not self.isArray:
+                        self.start = index
+                elif self.depth == 1 and self.isArray and char == 0x7b:
+                    self.start = index
+                self.depth += 1
+            else:  # ] or }
+                self.depth -= 1
+                if self.start is not None and self.depth == (1 if self.isArray else 0):
+                    try:
+                        assets.append(json.loads(data[self.start:pos]))
+                    except ValueError as e:
+                        print("Megascans LiveLink Error decoding an asset from Bridge. Error: " + str(e))
+                    self.start = None
+                    self.emitted += 1
+        self.pos = pos
+
+        # Drop the assets that have been handed over.
+        if self.depth > 0 or self.emitted > 0:
+            consumed = self.start if self.start is not None else self.pos
+            if consumed > 0:
+                receiveBuffer.Discard(consumed)
+                self.pos -= consumed
+                if self.start is not None:
+                    self.start -= consumed
+        return assets
+
+    def IsComplete(self):
+        return self.emitted > 0 and self.depth == 0
 
 
-class thread_checker(threading.Thread):
+class ms_Init(threading.Thread):
 
         # Initialize the thread and assign the method (i.e. importer) to be called when it receives JSON data.
-    def __init__(self):
+    def __init__(self, importer, buffer_size=4096*2, activity=None, stream=False):
         threading.Thread.__init__(self)
+        self.importer = importer
+        self.buffer_size = buffer_size
+        # When streaming, the importer is called with a list holding one asset as soon as
+        # the asset is received. Otherwise it gets the raw payload once the peer closes.
+        self.stream = stream
+        # Optional event set whenever a transfer starts or progresses.
+        self.activity = activity
+        # One receive buffer per connected client, keyed by the client socket.
+        self.connections = {}
+        self.run_livelink = True
+        self.socket_ = None
+        # Self-pipe used by Stop to wake the selector up from another thread.
+        self.wakeup_r, self.wakeup_w = socket.socketpair()
+        # Never keep Blender alive because of the listener.
+        self.daemon = True
+
+    # Bind the listening socket. Called before the thread starts so that errors such as
+    # the port being in use are reported to the caller.
+    def Bind(self, host='localhost', port=28888):
+        # Making a socket object.
+        socket_ = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        # Allow binding again right after a stop, while closed connections linger in TIME_WAIT.
+        # On Windows this option would let other processes share the port.
+        if os.name != 'nt':
+            socket_.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        try:
+            # Binding the socket to host and port number mentioned at the start.
+            socket_.bind((host, port))
+            socket_.listen(socket.SOMAXCONN)
+            socket_.setblocking(False)
+        except Exception:
+            socket_.close()
+            raise
+        self.socket_ = socket_
 
         # Start the thread to start listing to the port.
     def run(self):
         try:
-            run_checker = True
-            while run_checker:
-                time.sleep(3)
-                for i in threading.enumerate():
-                    if(i.getName() == "MainThread" and i.is_alive() == False):
-                        host, port = 'localhost', 28888
-                        s = socket.socket()
-                        s.connect((host, port))
-                        data = "Bye Megascans"
-                        s.send(data.encode())
-                        s.close()
-                        run_checker = False
+            if self.socket_ is None:
+                self.Bind()
+            socket_ = self.socket_
+
+            # The selector lets a single thread serve every Bridge connection at once,
+            # so a slow or stalled sender no longer blocks the others.
+            self.selector = selectors.DefaultSelector()
+            self.selector.register(socket_, selectors.EVENT_READ, None)
+            self.wakeup_r.setblocking(False)
+            self.selector.register(self.wakeup_r, selectors.EVENT_READ, "wakeup")
+
+            # Run until a shutdown message is received or Stop is called.
+            while self.run_livelink:
+                for key, mask in self.selector.select():
+                    if key.data is None:
+                        self.AcceptConnection(key.fileobj)
+                    elif key.data == "wakeup":
                         break
+                    else:
+                        self.ReceiveData(key.fileobj)
+                    if not self.run_livelink:
+                        break
+
+            for client in list(self.connections.keys()):
+                self.CloseConnection(client)
+            self.selector.close()
         except Exception as e:
-            print("Megascans LiveLink Error initializing thread checker. Error: ", str(e))
+            print("Megascans LiveLink Error initializing the thread. Error: " + str(e))
+        finally:
+            if self.socket_ is not None:
+                self.socket_.close()
+            self.wakeup_r.close()
+            self.wakeup_w.close()
+
+    # Stop the listener from any thread. The listening port is released right away.
+    def Stop(self):
+        self.run_livelink = False
+        try:
+            self.wakeup_w.send(b'\0')
+        except OSError:
             pass
 
+    def AcceptConnection(self, socket_):
+        # Accept every pending connection request.
+        while True:
+            try:
+                client, addr = socket_.accept()
+            except BlockingIOError:
+                break
+            client.setblocking(False)
+            parser = MS_StreamParser() if self.stream else None
+            self.connections[client] = MS_ReceiveBuffer(self.buffer_size, parser)
+            self.selector.register(client, selectors.EVENT_READ, addr)
+            self.SignalActivity()
+
+    def ReceiveData(self, client):
+        receiveBuffer = self.connections[client]
+        try:
+            # Receive data from the client straight into this connection's buffer.
+            with receiveBuffer.Reserve(self.buffer_size) as view:
+                received = client.recv_into(view, self.buffer_size)
+        except BlockingIOError:
+            return
+        except Exception as e:
+            print("Megascans LiveLink Error receiving data. Error: " + str(e))
+            self.CloseConnection(client)
+            return
+
+        # if we are getting data keep appending it to this connection's data.
+        if received:
+            receiveBuffer.length += received
+            if receiveBuffer.framed is None:
+                receiveBuffer.framed = MS_FramedProtocol.Detect(receiveBuffer)
+            if receiveBuffer.framed:
+                self.ReceiveFrames(client, receiveBuffer)
+            elif receiveBuffer.IsShutdownMessage():
+                self.run_livelink = False
+            elif receiveBuffer.parser is not None:
+                for asset in receiveBuffer.parser.Feed(receiveBuffer):
+                    self.Deliver(receiveBuffer, [asset])
+            self.SignalActivity()
+            return
+
+        # Once the data transmission is over call the importer method and send the collected data.
+        self.CloseConnection(client)
+        parser = receiveBuffer.parser
+        if receiveBuffer.framed:
+            if receiveBuffer.length:
+                print("Megascans LiveLink Error: the connection closed in the middle of a message")
+        elif receiveBuffer.IsShutdownMessage():
+            self.run_livelink = False
+        elif parser is not None and parser.emitted > 0:
+            if not parser.IsComplete():
+                print("Megascans LiveLink Error: the connection closed before the last asset was received")
+        elif receiveBuffer.length:
+            # Nothing could be streamed, let the import process report what is wrong with the payload.
+            self.Deliver(receiveBuffer, receiveBuffer.Payload())
+
+    def ReceiveFrames(self, client, receiveBuffer):
+        for messageType, payload in MS_FramedProtocol.Unpack(receiveBuffer):
+            receiveBuffer.framesReceived += 1
+            if messageType == MS_FramedProtocol.DATA:
+                # Only ack the payloads the importer accepted.
+                if not self.Deliver(receiveBuffer, payload):
+                    continue
+            elif messageType == MS_FramedProtocol.BYE:
+                self.run_livelink = False
+            else:
+                # Close the connection rather than leave the sender waiting for an ack.
+                print("Megascans LiveLink Error: unknown message type %d, closing the connection" % messageType)
+                self.CloseConnection(client)
+                return
+            self.SendAck(client, receiveBuffer.framesReceived)
+
+    # Hand a received payload to the importer, recording how long receiving it took.
+    # Returns False when the importer refused the payload, e.g. because LiveLink is stopping.
+    def Deliver(self, receiveBuffer, payload):
+        now = time.perf_counter()
+        globals()['MG_Telemetry'].Record("receive", receiveBuffer.receiveStart, now - receiveBuffer.receiveStart)
+        receiveBuffer.receiveStart = now
+        if self.importer(payload) is False:
+            print("Megascans LiveLink: dropped a payload from Bridge because LiveLink is stopping")
+            return False
+        return True
+
+    def SendAck(self, client, sequence):
+        try:
+            client.send(MS_FramedProtocol.Pack(MS_FramedProtocol.ACK, struct.pack('!I', sequence)))
+        except Exception as e:
+            print("Megascans LiveLink Error sending an ack. Error: " + str(e))
+
+    def SignalActivity(self):
+        if self.activity is not None:
+            self.activity.set()
+
+    def CloseConnection(self, client):
+        self.connections.pop(client, None)
+        try:
+            self.selector.unregister(client)
+        except Exception:
+            pass
+        client.close()
+
+
+class MS_LiveLinkLifecycle():
+
+    # Owns the listener thread and stops it as soon as Blender exits or the add-on is
+    # unregistered, through atexit and unregister() instead of polling for the main
+    # thread. The listener can be started again in the same session once stopped.
+    def __init__(self):
+        self.server = None
+        self.timer = None
+        self.atexitRegistered = False
+
+    def IsRunning(self):
+        return self.server is not None and self.server.is_alive()
+
+    # Start the listener and the main thread timer. Raises if the port can't be bound.
+    def Start(self, importer, timer, bufferSize, activity, stream):
+        if self.IsRunning():
+            return False
+        # Clean up after a listener that was stopped by a shutdown message.
+        self.Stop()
+        globals()['MG_ImportQueue'].Open()
+        server = ms_Init(importer, bufferSize, activity, stream)
+        server.Bind()
+        server.start()
+        self.server = server
+        self.timer = timer
+        bpy.app.timers.register(timer)
+        if not self.atexitRegistered:
+            atexit.register(self.Stop)
+            self.atexitRegistered = True
+        return True
+
+    def Stop(self, timeout=2.0):
+        if self.timer is not None:
+            try:
+                if bpy.app.timers.is_registered(self.timer):
+                    bpy.app.timers.unregister(self.timer)
+            except Exception:
+                pass
+            self.timer = None
+        if self.server is not None:
+            # The timer is gone and won't drain the queue anymore, release a receiver
+            # waiting for free space in it.
+            globals()['MG_ImportQueue'].Close()
+            self.server.Stop()
+            if self.server is not threading.current_thread():
+                self.server.join(timeout)
+            self.server = None
+            stats = globals()['MG_ImportQueue'].Stats()
+            print("Megascans LiveLink stopped: %d payloads received, %d imported, %d pending, %d dropped" % (
+                stats["enqueued"], stats["processed"], stats["pending"], stats["dropped"]))
+
+    def Unregister(self):
+        self.Stop()
+        if self.atexitRegistered:
+            atexit.unregister(self.Stop)
+            self.atexitRegistered = False
+
+globals()['MG_LiveLinkLifecycle'] = MS_LiveLinkLifecycle()
+
 
 class MS_Init_LiveLink(bpy.types.Operator):
 
@@ -732,12 +2654,17 @@ class MS_Init_LiveLink(bpy.types.Operator):
     bl_label = "Megascans LiveLink Octane"
     socketCount = 0
 
+    # The timer and the listener only use module level objects: Blender frees the Python
+    # instance of an operator once it leaves the operator history.
     def execute(self, context):
         try:
-            globals()['Megascans_DataSet'] = None
-            self.thread_ = threading.Thread(target=self.socketMonitor)
-            self.thread_.start()
-            bpy.app.timers.register(self.newDataMonitor)
+            prefs = bpy.context.preferences.addons[__name__].preferences
+            importQueue = globals()['MG_ImportQueue']
+            importQueue.Configure(prefs.import_queue_size, prefs.coalesce_imports)
+            scheduler = globals()['MG_ImportScheduler']
+            scheduler.Configure(prefs.import_time_budget / 1000.0)
+            globals()['MG_LiveLinkLifecycle'].Start(importQueue.Put, scheduler.newDataMonitor, prefs.recv_buffer_size * 1024,
+                                                    importQueue.activity, prefs.stream_assets)
             print("Megascans LiveLink Octane Started. Tips: Imported Surface material can be found in the Material Slots")
             self.report({'INFO'}, 'Megascans LiveLink Octane Started. Tips: Imported Surface material can be found in the Material Slots')
             return {'FINISHED'}
@@ -746,39 +2673,76 @@ class MS_Init_LiveLink(bpy.types.Operator):
             self.report({'WARNING'}, 'Megascans LiveLink error starting blender plugin. Error: ' + str(e))
             return {"FAILED"}
 
-    def newDataMonitor(self):
-        try:
-            if globals()['Megascans_DataSet'] != None:
-                MS_Init_ImportProcess()
-                globals()['Megascans_DataSet'] = None
-        except Exception as e:
-            print(
-                "Megascans LiveLink error starting blender plugin (newDataMonitor). Error: ", str(e))
-            return {"FAILED"}
-        return 1.0
-
-    def socketMonitor(self):
-        try:
-            # Making a thread object
-            threadedServer = ms_Init(self.importer)
-            # Start the newly created thread.
-            threadedServer.start()
-            # Making a thread object
-            thread_checker_ = thread_checker()
-            # Start the newly created thread.
-            thread_checker_.start()
-        except Exception as e:
-            print(
-                "Megascans LiveLink error starting blender plugin (socketMonitor). Error: ", str(e))
-            return {"FAILED"}
 
-    def importer(self, recv_data):
-        try:
-            globals()['Megascans_DataSet'] = recv_data
-        except Exception as e:
-            print(
-                "Megascans LiveLink error starting blender plugin (importer). Error: ", str(e))
-            return {"FAILED"}
+class MS_AlembicImporter():
+
+    # Imports the Alembic files queued in MG_AlembicPath as (asset ID, path) pairs, one file per
+    # timer tick so the interface stays responsive between files of large caches. Each file
+    # is imported synchronously because a background job gives no way of knowing when its
+    # objects exist. The imported objects get the material of their asset from MG_Material,
+    # and the materials created by the Alembic importer are removed at the end of the batch.
+    interval = 0.01
+
+    def __init__(self):
+        self.timer = None
+        self.replacedMaterials = set()
+
+    def IsRunning(self):
+        return self.timer is not None and bpy.app.timers.is_registered(self.timer)
+
+    def Start(self):
+        if globals()['MG_AlembicPath'] and not self.IsRunning():
+            self.timer = self.ImportNext
+            bpy.app.timers.register(self.timer, first_interval=self.interval)
+
+    def Stop(self):
+        if self.IsRunning():
+            bpy.app.timers.unregister(self.timer)
+        self.timer = None
+
+    def ImportNext(self):
+        assetPaths = globals()['MG_AlembicPath']
+        if assetPaths:
+            assetID, meshPath = assetPaths.pop(0)
+            try:
+                self.ImportFile(meshPath, globals()['MG_Material'].get(assetID))
+            except Exception as e:
+                print("Megascans Plugin Error importing Alembic file " + meshPath + ". Error: ", str(e))
+        if assetPaths:
+            return self.interval
+        self.Finish()
+        self.timer = None
+        return None
+
+    def ImportFile(self, meshPath, mat):
+        objectsBefore = set(bpy.data.objects)
+        importStart = time.perf_counter()
+        bpy.ops.wm.alembic_import(filepath=meshPath, as_background_job=False)
+        globals()['MG_Telemetry'].Record("alembic", importStart, time.perf_counter() - importStart)
+        if mat is None:
+            return
+        for obj in bpy.data.objects:
+            if obj in objectsBefore or not hasattr(obj.data, "materials"):
+                continue
+            for slot in obj.material_slots:
+                if slot.material is not None and slot.material != mat:
+                    self.replacedMaterials.add(slot.material)
+                slot.material = mat
+            if not obj.material_slots:
+                obj.active_material = mat
+
+    # Remove the replaced materials that nothing uses anymore in a single call.
+    def Finish(self):
+        assetMaterials = set(globals()['MG_Material'].values())
+        unused = [mat for mat in self.replacedMaterials
+                  if mat.users == 0 and mat not in assetMaterials]
+        if unused:
+            bpy.data.batch_remove(unused)
+        self.replacedMaterials.clear()
+        globals()['MG_Material'] = {}
+        globals()['MG_ImportComplete'] = False
+
+globals()['MG_AlembicImporter'] = MS_AlembicImporter()
 
 
 class MS_Init_Abc(bpy.types.Operator):
@@ -790,44 +2754,140 @@ class MS_Init_Abc(bpy.types.Operator):
 
         try:
             if globals()['MG_ImportComplete']:
-
-                assetMeshPaths = globals()['MG_AlembicPath']
-                assetMaterials = globals()['MG_Material']
-
-                if len(assetMeshPaths) > 0 and len(assetMaterials) > 0:
-
-                    materialIndex = 0
-                    old_materials = []
-                    for meshPaths in assetMeshPaths:
-                        for meshPath in meshPaths:
-                            bpy.ops.wm.alembic_import(
-                                filepath=meshPath, as_background_job=False)
-                            for o in bpy.context.scene.objects:
-                                if o.select_get():
-                                    old_materials.append(o.active_material)
-                                    o.active_material = assetMaterials[materialIndex]
-
-                        materialIndex += 1
-
-                    for mat in old_materials:
-                        try:
-                            if mat is not None:
-                                bpy.data.materials.remove(mat)
-                        except:
-                            pass
-
-                    globals()['MG_AlembicPath'] = []
-                    globals()['MG_Material'] = []
-                    globals()['MG_ImportComplete'] = False
-
+                globals()['MG_AlembicImporter'].Start()
             return {'FINISHED'}
         except Exception as e:
             print("Megascans Plugin Error starting MS_Init_Abc. Error: ", str(e))
             return {"CANCELLED"}
 
+# Batch import
+# Imports Bridge asset descriptions without Bridge and saves them as .blend libraries, for example:
+# blender -b --addons MSLiveLink_Octane --python-expr "import MSLiveLink_Octane as ms; ms.batch_main()" -- /path/to/json /path/to/library --workers 4
+# The source is a folder of Bridge JSON files or a JSONL file with one asset or payload per line.
+# Every worker Blender imports one shard of the assets into shard_NNN.blend, then the shards
+# are merged into library.blend. The user preferences are used, so Octane has to be enabled.
+# Blender exits with status 1 when a shard failed, after merging the shards that succeeded.
+
+# Read the asset descriptions of `source`, in file order.
+def load_asset_descriptions(source):
+    documents = []
+    if os.path.isdir(source):
+        for fileName in sorted(os.listdir(source)):
+            if fileName.lower().endswith(".json"):
+                with open(os.path.join(source, fileName), "rb") as f:
+                    documents.append(json.load(f))
+    else:
+        with open(source, "rb") as f:
+            documents = [json.loads(line) for line in f if line.strip()]
+    assetList = []
+    for document in documents:
+        if isinstance(document, list):
+            assetList += document
+        else:
+            assetList.append(document)
+    return assetList
+
+# Import `assetList` into the current file synchronously and save it to `outputPath`.
+def batch_import(assetList, outputPath):
+    # Start from an empty file, without the default cube, camera and light.
+    bpy.ops.wm.read_homefile(use_empty=True)
+    try:
+        bpy.context.scene.render.engine = 'octane'
+    except Exception as e:
+        print("Megascans LiveLink batch import could not select Octane. Error: ", str(e))
+    job = MS_Init_ImportProcess([assetList])
+    job.Run(float("inf"))
+    # Timers don't run in background mode, import the queued Alembic files right away.
+    alembicImporter = globals()['MG_AlembicImporter']
+    alembicImporter.Stop()
+    while alembicImporter.ImportNext() is not None:
+        pass
+    globals()['MG_TextureConverter'].SwapConverted(wait=True)
+    mark_assets()
+    bpy.ops.wm.save_as_mainfile(filepath=outputPath)
+    print("Megascans LiveLink batch import: saved %d assets to %s" % (len(job.assetList), outputPath))
+
+# Mark the imported materials and top level objects as assets (Blender 3.0 and later).
+def mark_assets():
+    for mat in bpy.data.materials:
+        if MS_MaterialRegistry.fingerprintKey in mat and hasattr(mat, "asset_mark"):
+            mat.asset_mark()
+    for obj in bpy.data.objects:
+        if obj.parent is None and hasattr(obj, "asset_mark"):
+            obj.asset_mark()
+
+# Append the contents of the shard files into the current file, one collection per shard.
+def merge_libraries(shardPaths, outputPath):
+    bpy.ops.wm.read_homefile(use_empty=True)
+    for shardPath in shardPaths:
+        with bpy.data.libraries.load(shardPath, link=False) as (dataFrom, dataTo):
+            dataTo.collections = dataFrom.collections
+            dataTo.objects = dataFrom.objects
+            dataTo.materials = dataFrom.materials
+        shardCollection = bpy.data.collections.new(os.path.splitext(os.path.basename(shardPath))[0])
+        bpy.context.scene.collection.children.link(shardCollection)
+        loadedCollections = [c for c in dataTo.collections if c is not None]
+        childCollections = set(child for c in loadedCollections for child in c.children)
+        for collection in loadedCollections:
+            if collection not in childCollections:
+                shardCollection.children.link(collection)
+        for obj in dataTo.objects:
+            if obj is not None and not obj.users_collection:
+                shardCollection.objects.link(obj)
+    mark_assets()
+    bpy.ops.wm.save_as_mainfile(filepath=outputPath)
+    print("Megascans LiveLink batch import: merged %d shards into %s" % (len(shardPaths), outputPath))
+
+def batch_main(argv=None):
+    if argv is None:
+        argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    parser = argparse.ArgumentParser(prog="MSLiveLink_Octane batch import")
+    parser.add_argument("source", help="Folder of Bridge JSON files or a JSONL file")
+    parser.add_argument("output", help="Folder the .blend libraries are written to")
+    parser.add_argument("--workers", type=int, default=1, help="Number of Blender processes")
+    parser.add_argument("--shard", type=int, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    os.makedirs(args.output, exist_ok=True)
+    workers = max(args.workers, 1)
+
+    # Worker: import every `workers`-th asset starting at the shard index.
+    if args.shard is not None:
+        assetList = load_asset_descriptions(args.source)[args.shard::workers]
+        batch_import(assetList, os.path.join(args.output, "shard_%03d.blend" % args.shard))
+        return
+
+    assetCount = len(load_asset_descriptions(args.source))
+    workers = min(workers, max(assetCount, 1))
+    print("Megascans LiveLink batch import: %d assets on %d workers" % (assetCount, workers))
+    command = [bpy.app.binary_path, "-b", "--addons", __name__, "--python-exit-code", "1",
+               "--python-expr", "import %s as ms; ms.batch_main()" % __name__, "--",
+               args.source, args.output, "--workers", str(workers), "--shard"]
+    for shard in range(workers):
+        shardPath = os.path.join(args.output, "shard_%03d.blend" % shard)
+        if os.path.exists(shardPath):
+            os.remove(shardPath)
+    processes = [subprocess.Popen(command + [str(shard)]) for shard in range(workers)]
+    shardPaths = []
+    failedShards = []
+    for shard, process in enumerate(processes):
+        shardPath = os.path.join(args.output, "shard_%03d.blend" % shard)
+        if process.wait() == 0 and os.path.exists(shardPath):
+            shardPaths.append(shardPath)
+        else:
+            print("Megascans LiveLink batch import: shard %d failed with exit code %d" % (shard, process.returncode))
+            failedShards.append(shard)
+    merge_libraries(shardPaths, os.path.join(args.output, "library.blend"))
+    # The library holds the assets of the shards that succeeded, but the batch is incomplete.
+    if failedShards:
+        print("Megascans LiveLink batch import: %d of %d shards failed" % (len(failedShards), workers))
+        sys.exit(1)
+
 # Check if the port is in use
 def is_port_in_use(port):
     with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        # Same option as the listener, so connections lingering after a stop don't count.
+        if os.name != 'nt':
+            s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         try:
             s.bind(("127.0.0.1", port))
         except socket.error as e:
@@ -836,10 +2896,96 @@ def is_port_in_use(port):
         s.close()
         return False
 
+class MS_Swap_FullRes(bpy.types.Operator):
+
+    bl_idname = "ms_livelink_fullres.py"
+    bl_label = "Swap Megascans Textures to Full Resolution"
+
+    def execute(self, context):
+        try:
+            swapped = globals()['MG_TextureProxies'].SwapToFullResolution()
+            self.report({'INFO'}, 'Swapped %d Megascans textures to full resolution' % swapped)
+            return {'FINISHED'}
+        except Exception as e:
+            print("Megascans LiveLink Error swapping textures to full resolution. Error: ", str(e))
+            self.report({'WARNING'}, 'Megascans LiveLink Error swapping textures to full resolution. Error: ' + str(e))
+            return {"CANCELLED"}
+
+class MS_Export_Telemetry(bpy.types.Operator):
+
+    bl_idname = "ms_livelink_export_telemetry.py"
+    bl_label = "Export Megascans LiveLink Telemetry"
+
+    filepath: StringProperty(subtype='FILE_PATH')
+    file_format: EnumProperty(
+        items=[
+            ('CHROME', 'Chrome Trace', 'Trace Event JSON for chrome://tracing or Perfetto'),
+            ('CSV', 'CSV', 'One row per span')
+        ],
+        name="Format",
+        default='CHROME'
+    )
+
+    def invoke(self, context, event):
+        if not self.filepath:
+            self.filepath = "mslivelink_trace" + (".json" if self.file_format == 'CHROME' else ".csv")
+        context.window_manager.fileselect_add(self)
+        return {'RUNNING_MODAL'}
+
+    def execute(self, context):
+        try:
+            telemetry = globals()['MG_Telemetry']
+            if self.file_format == 'CHROME':
+                count = telemetry.ExportChromeTrace(self.filepath)
+            else:
+                count = telemetry.ExportCSV(self.filepath)
+            self.report({'INFO'}, 'Exported %d Megascans LiveLink spans to %s' % (count, self.filepath))
+            return {'FINISHED'}
+        except Exception as e:
+            print("Megascans LiveLink Error exporting telemetry. Error: ", str(e))
+            self.report({'WARNING'}, 'Megascans LiveLink Error exporting telemetry. Error: ' + str(e))
+            return {"CANCELLED"}
+
+class MS_Clear_Telemetry(bpy.types.Operator):
+
+    bl_idname = "ms_livelink_clear_telemetry.py"
+    bl_label = "Clear Megascans LiveLink Telemetry"
+
+    def execute(self, context):
+        globals()['MG_Telemetry'].Clear()
+        return {'FINISHED'}
+
+class MS_Realize_Materials(bpy.types.Operator):
+
+    bl_idname = "ms_livelink_realize.py"
+    bl_label = "Realize Megascans Placeholder Materials"
+
+    def execute(self, context):
+        try:
+            realized = globals()['MG_LazyMaterials'].RealizeAll()
+            self.report({'INFO'}, 'Realized %d Megascans materials' % realized)
+            return {'FINISHED'}
+        except Exception as e:
+            print("Megascans LiveLink Error realizing materials. Error: ", str(e))
+            self.report({'WARNING'}, 'Megascans LiveLink Error realizing materials. Error: ' + str(e))
+            return {"CANCELLED"}
+
+class MS_Stop_LiveLink(bpy.types.Operator):
+
+    bl_idname = "ms_livelink_stop.py"
+    bl_label = "Stop Megascans LiveLink Octane"
+
+    def execute(self, context):
+        globals()['MG_LiveLinkLifecycle'].Stop()
+        self.report({'INFO'}, 'Megascans LiveLink Octane Stopped')
+        return {'FINISHED'}
+
 def menu_func_import(self, context):
     layout = self.layout
     col = layout.column()
-    if(context.scene.render.engine == 'octane'):
+    if(globals()['MG_LiveLinkLifecycle'].IsRunning()):
+        col.operator(MS_Stop_LiveLink.bl_idname, text="Stop Megascans LiveLink Octane")
+    elif(context.scene.render.engine == 'octane'):
         if(not is_port_in_use(28888)):
             col.operator(MS_Init_LiveLink.bl_idname, text="Start Megascans LiveLink Octane")
         else:
@@ -847,20 +2993,57 @@ def menu_func_import(self, context):
     else:
         col.enabled = False
         col.operator(MS_Init_LiveLink.bl_idname, text="Start Megascans LiveLink Octane")
-    #col.operator(MS_Init_Abc.bl_idname, text="Import Megascans Alembic for Octane)")
+    col.operator(MS_Swap_FullRes.bl_idname, text="Swap Megascans Textures to Full Resolution")
+    col.operator(MS_Realize_Materials.bl_idname, text="Realize Megascans Placeholder Materials")
+    abcCol = layout.column()
+    abcCol.enabled = globals()['MG_ImportComplete'] and not globals()['MG_AlembicImporter'].IsRunning()
+    abcCol.operator(MS_Init_Abc.bl_idname, text="Import Megascans Alembic for Octane")
+
+
+# The session caches refer to datablocks by name, which belong to other data once another
+# file is opened.
+@bpy.app.handlers.persistent
+def load_post_handler(dummy):
+    globals()['MG_ImageCache'].Clear()
+    globals()['MG_MeshCache'].Clear()
+    globals()['MG_MaterialRegistry'].Clear()
+    # Placeholders saved in lazy mode are realized once the opened file is viewed rendered.
+    lazyMaterials = globals()['MG_LazyMaterials']
+    lazyMaterials.Stop()
+    if lazyMaterials.Placeholders():
+        lazyMaterials.Watch()
 
 
 def register():
     bpy.utils.register_class(MS_Init_LiveLink)
-    # bpy.utils.register_class(MS_Init_Abc)
+    bpy.utils.register_class(MS_Stop_LiveLink)
+    bpy.utils.register_class(MS_Swap_FullRes)
+    bpy.utils.register_class(MS_Realize_Materials)
+    bpy.utils.register_class(MS_Init_Abc)
+    bpy.utils.register_class(MS_Export_Telemetry)
+    bpy.utils.register_class(MS_Clear_Telemetry)
     bpy.utils.register_class(MSLiveLinkPrefs)
     bpy.types.TOPBAR_MT_file_import.append(menu_func_import)
+    bpy.app.handlers.load_post.append(load_post_handler)
 
 
 def unregister():
+    globals()['MG_LiveLinkLifecycle'].Unregister()
+    globals()['MG_TexturePrefetcher'].Shutdown()
+    globals()['MG_TextureConverter'].Shutdown()
+    globals()['MG_ChannelPacker'].Shutdown()
+    globals()['MG_AlembicImporter'].Stop()
+    globals()['MG_LazyMaterials'].Stop()
+    if load_post_handler in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.remove(load_post_handler)
     bpy.types.TOPBAR_MT_file_import.remove(menu_func_import)
     bpy.utils.unregister_class(MSLiveLinkPrefs)
-    # bpy.utils.register_class(MS_Init_Abc)
+    bpy.utils.unregister_class(MS_Clear_Telemetry)
+    bpy.utils.unregister_class(MS_Export_Telemetry)
+    bpy.utils.unregister_class(MS_Init_Abc)
+    bpy.utils.unregister_class(MS_Realize_Materials)
+    bpy.utils.unregister_class(MS_Swap_FullRes)
+    bpy.utils.unregister_class(MS_Stop_LiveLink)
     bpy.utils.unregister_class(MS_Init_LiveLink)
 
 
@@ -0,0 +1,121 @@
+# Benchmark of the asset import, runnable without Blender through a stub bpy (see fake_bpy.py):
+#   python benchmarks/bench_import.py --assets 20 --components 8 --lods 2
+# or inside Blender, with Octane as the render engine:
+#   blender -b --addons MSLiveLink_Octane --python benchmarks/bench_import.py -- --assets 20
+# Reports the wall time of every import phase and the node, link, image and geometry
+# operations made. Real PNG textures and OBJ meshes are generated in --directory.
+#
+# The payload is imported --repeat times. With the stub, the script exits with status 1
+# when a first import doesn't load every texture and mesh exactly once or a repeated import
+# loads anything. The time per asset can be checked against --max-ms-per-asset and against
+# a report saved with --save-baseline, e.g. on the main branch, given to --baseline.
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from synthetic import synthetic_payload
+
+
+# Run a full import of `payloads` synchronously and report the wall time spent in every
+# phase, the Blender operations made and optionally the peak Python allocations.
+def benchmark_import(addon, payloads, trace_allocations=False):
+    if trace_allocations:
+        tracemalloc.start()
+    benchStart = time.perf_counter()
+    job = addon.MS_Init_ImportProcess(payloads)
+    job.Run(float("inf"))
+    report = {"total": time.perf_counter() - benchStart,
+              "assets": len(job.assetList),
+              "phases": dict(job.phaseTimes),
+              "operations": dict(job.operationCounts)}
+    if trace_allocations:
+        report["peak allocations"] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    print("Megascans LiveLink import benchmark: %d assets in %.1f ms" % (report["assets"], report["total"] * 1000))
+    for phase, seconds in sorted(report["phases"].items()):
+        print("  %-20s %10.1f ms" % (phase, seconds * 1000))
+    for operation, count in sorted(report["operations"].items()):
+        print("  %-20s %10d" % (operation, count))
+    if trace_allocations:
+        print("  %-20s %10.1f MB" % ("peak allocations", report["peak allocations"] / 1048576.0))
+    return report
+
+
+def main():
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else sys.argv[1:]
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--assets", type=int, default=20)
+    parser.add_argument("--components", type=int, default=8)
+    parser.add_argument("--lods", type=int, default=0)
+    parser.add_argument("--texture-size", type=int, default=512)
+    parser.add_argument("--mesh-resolution", type=int, default=256)
+    parser.add_argument("--directory", default=os.path.join(tempfile.gettempdir(), "ms_bench"))
+    parser.add_argument("--trace-allocations", action="store_true")
+    parser.add_argument("--repeat", type=int, default=2, help="Number of imports of the payload")
+    parser.add_argument("--max-ms-per-asset", type=float, default=None,
+                        help="Fail when the first import takes longer per asset")
+    parser.add_argument("--baseline", default=None, help="Report saved by --save-baseline to compare with")
+    parser.add_argument("--tolerance", type=float, default=1.5,
+                        help="Fail when the first import is this many times slower than the baseline")
+    parser.add_argument("--save-baseline", default=None, help="Save the report of the first import to this file")
+    args = parser.parse_args(argv)
+
+    # Inside Blender the real bpy is already loaded, together with the add-on.
+    stub = "bpy" not in sys.modules
+    if stub:
+        import fake_bpy
+        addon = fake_bpy.install(prefs={"instance_repeated_meshes": True})
+    else:
+        import MSLiveLink_Octane as addon
+    payload = synthetic_payload(args.directory, args.assets, args.components, args.lods,
+                                args.texture_size, args.mesh_resolution)
+
+    failures = []
+    reports = []
+    for run in range(max(args.repeat, 1)):
+        if stub:
+            fake_bpy.OPERATIONS.clear()
+        report = benchmark_import(addon, [payload], args.trace_allocations)
+        reports.append(report)
+        if not stub:
+            continue
+        print("Stub bpy operations:")
+        for operation, count in sorted(fake_bpy.OPERATIONS.items()):
+            print("  %-20s %10d" % (operation, count))
+        # The first import loads every file once, the others reuse what it created.
+        expected = {"image loads": args.assets * args.components if run == 0 else 0,
+                    "geometry imports": args.assets * args.lods if run == 0 else 0}
+        for operation, count in expected.items():
+            if fake_bpy.OPERATIONS[operation] != count:
+                failures.append("import %d: %d %s, expected %d" % (run + 1, fake_bpy.OPERATIONS[operation], operation, count))
+
+    msPerAsset = reports[0]["total"] * 1000 / max(args.assets, 1)
+    print("First import: %.2f ms per asset" % msPerAsset)
+    if args.max_ms_per_asset is not None and msPerAsset > args.max_ms_per_asset:
+        failures.append("%.2f ms per asset, the limit is %.2f ms" % (msPerAsset, args.max_ms_per_asset))
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        baselineMs = baseline["total"] * 1000 / max(baseline["assets"], 1)
+        print("Baseline: %.2f ms per asset, %.2fx" % (baselineMs, msPerAsset / baselineMs))
+        if msPerAsset > baselineMs * args.tolerance:
+            failures.append("%.2f ms per asset is more than %.1fx the baseline of %.2f ms" % (
+                msPerAsset, args.tolerance, baselineMs))
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(reports[0], f, indent=1)
+
+    for failure in failures:
+        print("FAILED: " + failure)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
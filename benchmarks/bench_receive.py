@@ -0,0 +1,163 @@
+# Receive throughput benchmark of the LiveLink listener with a stub bpy (see fake_bpy.py):
+#   python benchmarks/bench_receive.py --sizes 1 10 100 --buffer-sizes 8 256
+# Sends one Bridge-like payload of every size in MB to ms_Init over loopback and reports
+# the throughput from the first byte sent to the payload reaching the importer, next to
+# the original listener loop (`TotalData += data` on 8 KB reads) as the baseline. The
+# streamed mode also times MS_StreamParser splitting the payload into assets, and the
+# parser alone is timed on a MS_ReceiveBuffer fed in socket-sized chunks. Every mode of
+# ms_Init is run for each receive buffer size in KB, 8 KB being the add-on's default.
+# The baseline copies the whole payload on every read, so 100 MB takes minutes with it;
+# --skip-baseline leaves it out.
+
+import argparse
+import json
+import os
+import socket
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import fake_bpy
+from livelink_client import LiveLinkClient
+
+MB = 1024 * 1024
+
+
+# A JSON array of assets adding up to about `size` bytes.
+def Payload(size, assetSize=64 * 1024):
+    asset = {"id": "", "name": "Benchmark asset", "padding": "x" * assetSize}
+    count = max(1, size // assetSize)
+    assets = [dict(asset, id="asset_%d" % index) for index in range(count)]
+    return json.dumps(assets).encode(), count
+
+
+class BaselineListener(threading.Thread):
+
+    # The receive loop of ms_Init before the listener was rewritten: one blocking client
+    # at a time and the payload assembled by concatenating bytes.
+    def __init__(self, importer):
+        threading.Thread.__init__(self)
+        self.importer = importer
+        self.daemon = True
+        self.socket_ = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.socket_.bind(('localhost', 0))
+        self.socket_.listen(5)
+
+    def run(self):
+        client, addr = self.socket_.accept()
+        self.TotalData = b""
+        while True:
+            data = client.recv(4096*2)
+            if data:
+                self.TotalData += data
+            else:
+                self.importer(self.TotalData)
+                break
+        client.close()
+        self.socket_.close()
+
+
+def Baseline(addon, payload, count):
+    received = []
+    done = threading.Event()
+
+    def importer(data):
+        received.append(data)
+        done.set()
+
+    server = BaselineListener(importer)
+    port = server.socket_.getsockname()[1]
+    server.start()
+    # The original loop is slow enough on large payloads for any send timeout to expire.
+    client = LiveLinkClient(addon.MS_FramedProtocol, port=port, framed=False, timeout=None)
+    begin = time.perf_counter()
+    client.Send(payload)
+    done.wait()
+    elapsed = time.perf_counter() - begin
+    if len(received[0]) != len(payload):
+        return None
+    return elapsed
+
+
+def Receive(addon, payload, count, framed, stream, bufferSize):
+    received = []
+    done = threading.Event()
+
+    def importer(data):
+        received.append(data)
+        if not stream or len(received) == count:
+            done.set()
+
+    server = addon.ms_Init(importer, bufferSize, None, stream)
+    server.Bind(port=0)
+    port = server.socket_.getsockname()[1]
+    server.start()
+
+    client = LiveLinkClient(addon.MS_FramedProtocol, port=port, framed=framed, timeout=60.0)
+    begin = time.perf_counter()
+    client.Send(payload)
+    done.wait(120)
+    elapsed = time.perf_counter() - begin
+    client.Close()
+    server.Stop()
+    server.join(5)
+
+    if not done.is_set():
+        return None
+    if not stream and len(received[0]) != len(payload):
+        return None
+    return elapsed
+
+
+def Parse(addon, payload, count, bufferSize):
+    receiveBuffer = addon.MS_ReceiveBuffer(bufferSize, addon.MS_StreamParser())
+    assets = 0
+    begin = time.perf_counter()
+    for offset in range(0, len(payload), bufferSize):
+        chunk = payload[offset:offset + bufferSize]
+        with receiveBuffer.Reserve(len(chunk)) as view:
+            view[:len(chunk)] = chunk
+        receiveBuffer.length += len(chunk)
+        assets += len(receiveBuffer.parser.Feed(receiveBuffer))
+    elapsed = time.perf_counter() - begin
+    return elapsed if assets == count else None
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 10, 100], help="Payload sizes in MB")
+    parser.add_argument("--buffer-sizes", type=int, nargs="+", default=[8, 256],
+                        help="Receive buffer sizes in KB, the add-on defaults to 8")
+    parser.add_argument("--skip-baseline", action="store_true",
+                        help="Don't run the original loop, which is quadratic in the payload size")
+    args = parser.parse_args()
+
+    addon = fake_bpy.install()
+    ok = True
+    for size in args.sizes:
+        payload, count = Payload(size * MB)
+        baseline = None if args.skip_baseline else Baseline(addon, payload, count)
+        results = []
+        if not args.skip_baseline:
+            results.append(("baseline TotalData +=, 8 KB", baseline))
+        for bufferKB in args.buffer_sizes:
+            bufferSize = bufferKB * 1024
+            results += [("per connection, %d KB" % bufferKB, Receive(addon, payload, count, False, False, bufferSize)),
+                        ("per connection, streamed, %d KB" % bufferKB, Receive(addon, payload, count, False, True, bufferSize)),
+                        ("framed, %d KB" % bufferKB, Receive(addon, payload, count, True, False, bufferSize)),
+                        ("stream parser only, %d KB" % bufferKB, Parse(addon, payload, count, bufferSize))]
+        for mode, elapsed in results:
+            if elapsed is None:
+                print("%4d MB  %-34s FAILED" % (size, mode))
+                ok = False
+                continue
+            line = "%4d MB  %-34s %9.1f ms %9.1f MB/s" % (size, mode, elapsed * 1000, len(payload) / MB / elapsed)
+            if baseline:
+                line += " %7.1fx baseline" % (baseline / elapsed)
+            print(line)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
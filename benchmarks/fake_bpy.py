@@ -0,0 +1,239 @@
+# Minimal stand-in for Blender's bpy module, so MSLiveLink_Octane can be imported and its
+# import path and listener driven with a plain Python interpreter, e.g. in CI.
+#
+# Node, link, image and import operations are counted in OPERATIONS. Image loads and
+# geometry imports read their whole file, so their I/O is part of the measured time.
+# Only the parts of bpy used by the add-on are implemented.
+
+import collections
+import importlib
+import os
+import sys
+import types
+
+OPERATIONS = collections.Counter()
+
+
+class Anything():
+    # Accepts any attribute access or call, for the UI parts of bpy.
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __getattr__(self, name):
+        return Anything()
+
+    def __call__(self, *args, **kwargs):
+        return Anything()
+
+    def __iter__(self):
+        return iter([])
+
+
+class Socket():
+    def __init__(self, name):
+        self.name = name
+        self.default_value = 0
+
+
+class Sockets(dict):
+    def __missing__(self, key):
+        socket = self[key] = Socket(key)
+        return socket
+
+
+class Node():
+    def __init__(self, bl_idname, name):
+        self.bl_idname = bl_idname
+        self.name = name
+        self.location = (0, 0)
+        self.image = None
+        self.inputs = Sockets()
+        self.outputs = Sockets()
+
+
+class Nodes(list):
+    def new(self, bl_idname):
+        OPERATIONS["nodes"] += 1
+        node = Node(bl_idname, "%s.%03d" % (bl_idname, len(self)))
+        self.append(node)
+        return node
+
+    def get(self, name):
+        return next((node for node in self if node.name == name), None)
+
+
+class Links(list):
+    def new(self, toSocket, fromSocket):
+        OPERATIONS["links"] += 1
+        self.append((toSocket, fromSocket))
+
+
+class ID():
+    def __init__(self, name):
+        self.name = name
+        self.users = 0
+        self.properties = {}
+
+    def __getitem__(self, key):
+        return self.properties[key]
+
+    def __setitem__(self, key, value):
+        self.properties[key] = value
+
+    def __delitem__(self, key):
+        del self.properties[key]
+
+    def __contains__(self, key):
+        return key in self.properties
+
+    def get(self, key, default=None):
+        return self.properties.get(key, default)
+
+    def as_pointer(self):
+        return id(self)
+
+
+class Material(ID):
+    def __init__(self, name):
+        ID.__init__(self, name)
+        self.use_nodes = False
+        self.node_tree = types.SimpleNamespace(nodes=Nodes(), links=Links())
+        self.node_tree.nodes += [Node("ShaderNodeOctUniversalMat", "Universal"),
+                                 Node("ShaderNodeOutputMaterial", "Material Output")]
+
+    def copy(self):
+        OPERATIONS["material copies"] += 1
+        mat = DATA.materials.new(self.name)
+        mat.properties = dict(self.properties)
+        mat.node_tree.nodes[:] = [Node(node.bl_idname, node.name) for node in self.node_tree.nodes]
+        mat.node_tree.links[:] = self.node_tree.links
+        return mat
+
+
+class Image(ID):
+    def __init__(self, name, filepath=""):
+        ID.__init__(self, name)
+        self.filepath = filepath
+        self.size = (0, 0)
+        self.alpha_mode = "STRAIGHT"
+        self.colorspace_settings = types.SimpleNamespace(name="sRGB")
+
+    def reload(self):
+        ReadFile(self.filepath)
+
+
+class Mesh():
+    def __init__(self, vertexCount):
+        self.vertices = range(vertexCount)
+
+
+class Object(ID):
+    def __init__(self, name, data=None):
+        ID.__init__(self, name)
+        self.data = data
+        self.type = "MESH" if data is not None else "EMPTY"
+        self.parent = None
+        self.material_slots = []
+        self.active_material = None
+        self.users_collection = []
+
+    def copy(self):
+        return DATA.objects.new(self.name, self.data)
+
+
+class Collection(ID):
+    def __init__(self, name):
+        ID.__init__(self, name)
+        self.objects = types.SimpleNamespace(link=lambda obj: None, unlink=lambda obj: None)
+        self.children = types.SimpleNamespace(link=lambda collection: None)
+
+
+class IDCollection(list):
+    def __init__(self, factory):
+        list.__init__(self)
+        self.factory = factory
+
+    def new(self, name, *args, **kwargs):
+        item = self.factory(name, *args)
+        self.append(item)
+        return item
+
+    def get(self, name, default=None):
+        return next((item for item in self if item.name == name), default)
+
+    def remove(self, item, **kwargs):
+        list.remove(self, item)
+
+
+# Read the whole file and return the number of OBJ vertex lines in it.
+def ReadFile(path):
+    vertices = 0
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            vertices += chunk.count(b"\nv ")
+    return vertices
+
+
+def LoadImage(filepath, check_existing=False):
+    if check_existing:
+        image = next((image for image in DATA.images if image.filepath == filepath), None)
+        if image is not None:
+            return image
+    OPERATIONS["image loads"] += 1
+    ReadFile(filepath)
+    return DATA.images.new(os.path.basename(filepath), filepath)
+
+
+def ImportGeometry(filepath, directory=None, files=None, **kwargs):
+    paths = [os.path.join(directory, f["name"]) for f in files] if files else [filepath]
+    for path in paths:
+        OPERATIONS["geometry imports"] += 1
+        mesh = Mesh(ReadFile(path))
+        DATA.objects.new(os.path.splitext(os.path.basename(path))[0], mesh)
+
+
+DATA = None
+
+
+# Install the stub as bpy, import the add-on and return it. `prefs` overrides the defaults
+# of the add-on preferences.
+def install(prefs=None, engine="octane"):
+    global DATA
+    DATA = types.SimpleNamespace(materials=IDCollection(Material), images=IDCollection(Image),
+                                 objects=IDCollection(Object), collections=IDCollection(Collection))
+    DATA.images.load = LoadImage
+    OPERATIONS.clear()
+
+    bpy = types.ModuleType("bpy")
+    bpy.data = DATA
+    bpy.types = types.SimpleNamespace(Operator=object, AddonPreferences=object, TOPBAR_MT_file_import=Anything())
+    bpy.props = types.ModuleType("bpy.props")
+    for name in ["BoolProperty", "EnumProperty", "IntProperty", "StringProperty"]:
+        setattr(bpy.props, name, lambda **kwargs: kwargs.get("default"))
+    timers = []
+    bpy.app = types.SimpleNamespace(binary_path=sys.executable, timers=types.SimpleNamespace(
+        register=lambda f, first_interval=0: timers.append(f),
+        unregister=timers.remove, is_registered=lambda f: f in timers),
+        handlers=types.SimpleNamespace(persistent=lambda f: f, load_post=[]))
+    bpy.ops = types.SimpleNamespace(import_scene=types.SimpleNamespace(fbx=ImportGeometry, obj=ImportGeometry),
+                                    wm=Anything())
+    bpy.path = types.SimpleNamespace(abspath=os.path.abspath)
+    bpy.utils = Anything()
+    sys.modules["bpy"] = bpy
+    sys.modules["bpy.types"] = bpy.types
+    sys.modules["bpy.props"] = bpy.props
+
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+    addon = importlib.import_module("MSLiveLink_Octane")
+
+    # The property functions above return their defaults, so the annotations of the
+    # preferences class hold the default preferences.
+    preferences = dict(addon.MSLiveLinkPrefs.__annotations__)
+    preferences.update(prefs or {})
+    bpy.context = types.SimpleNamespace(
+        scene=types.SimpleNamespace(render=types.SimpleNamespace(engine=engine), collection=Collection("Scene"),
+                                    cursor=types.SimpleNamespace(location=(0, 0, 0))),
+        collection=Collection("Collection"), view_layer=Anything(), window_manager=Anything(),
+        preferences=types.SimpleNamespace(addons=collections.defaultdict(
+            lambda: types.SimpleNamespace(preferences=types.SimpleNamespace(**preferences)))))
+    return addon
@@ -0,0 +1,67 @@
+# Minimal stand-in for Bridge, used by the benchmarks to send payloads to a running LiveLink
+# listener and to stop it.
+
+import socket
+import struct
+
+
+class LiveLinkClient():
+
+    # `protocol` is the MS_FramedProtocol class of the add-on under test. In framed mode one
+    # connection is reused for every message and each Send waits for the listener's ack;
+    # otherwise every payload opens a new connection.
+    def __init__(self, protocol, host='localhost', port=28888, framed=True, timeout=10.0):
+        self.protocol = protocol
+        self.address = (host, port)
+        self.framed = framed
+        self.timeout = timeout
+        self.socket = None
+
+    def Connect(self):
+        if self.socket is None:
+            self.socket = socket.create_connection(self.address, self.timeout)
+            self.socket.sendall(self.protocol.magic)
+        return self.socket
+
+    # Send a payload and return the listener's sequence number for it (framed mode only).
+    def Send(self, payload, messageType=None):
+        if not self.framed:
+            with socket.create_connection(self.address, self.timeout) as s:
+                s.sendall(payload)
+            return None
+        s = self.Connect()
+        if messageType is None:
+            messageType = self.protocol.DATA
+        s.sendall(self.protocol.Pack(messageType, payload))
+        return self.ReceiveAck()
+
+    def ReceiveAck(self):
+        header = self.ReceiveExactly(self.protocol.header.size)
+        messageType, size = self.protocol.header.unpack(header)
+        payload = self.ReceiveExactly(size)
+        if messageType != self.protocol.ACK:
+            raise ConnectionError("Unexpected LiveLink message type %d" % messageType)
+        return struct.unpack('!I', payload)[0]
+
+    def ReceiveExactly(self, size):
+        data = bytearray()
+        while len(data) < size:
+            chunk = self.socket.recv(size - len(data))
+            if not chunk:
+                raise ConnectionError("LiveLink closed the connection")
+            data += chunk
+        return bytes(data)
+
+    # Ask the listener to stop.
+    def Shutdown(self):
+        if not self.framed:
+            self.Send(b'Bye Megascans')
+            return
+        s = self.Connect()
+        s.sendall(self.protocol.Pack(self.protocol.BYE))
+        self.Close()
+
+    def Close(self):
+        if self.socket is not None:
+            self.socket.close()
+            self.socket = None
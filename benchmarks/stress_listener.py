@@ -0,0 +1,120 @@
+# Stress test of the LiveLink listener with a stub bpy (see fake_bpy.py), runnable without Blender:
+#   python benchmarks/stress_listener.py --senders 50 --payloads 4
+# Starts ms_Init on a free loopback port and has many senders connect to it at once, with
+# both the original one-payload-per-connection protocol and the framed protocol. Exits
+# with status 1 if any payload is lost or corrupted, or if a framed message of an unknown
+# type leaves its sender waiting instead of having the connection closed.
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import fake_bpy
+from livelink_client import LiveLinkClient
+
+
+def Payload(sender, index, size):
+    asset = {"id": "%d_%d" % (sender, index), "padding": "x" * size}
+    return json.dumps([asset]).encode()
+
+
+def Run(addon, senders, payloads, size, framed, stream):
+    received = []
+    lock = threading.Lock()
+
+    def importer(payload):
+        with lock:
+            received.append(payload if stream else json.loads(payload))
+
+    server = addon.ms_Init(importer, 8192, None, stream)
+    server.Bind(port=0)
+    port = server.socket_.getsockname()[1]
+    server.start()
+
+    errors = []
+    start = threading.Event()
+
+    def send(sender):
+        client = LiveLinkClient(addon.MS_FramedProtocol, port=port, framed=framed)
+        start.wait()
+        try:
+            for index in range(payloads):
+                client.Send(Payload(sender, index, size))
+        except Exception as e:
+            errors.append(e)
+        finally:
+            client.Close()
+
+    threads = [threading.Thread(target=send, args=(sender,)) for sender in range(senders)]
+    for thread in threads:
+        thread.start()
+    begin = time.perf_counter()
+    start.set()
+    for thread in threads:
+        thread.join()
+
+    # Unframed payloads are delivered when the listener sees the connection close.
+    expected = senders * payloads
+    deadline = time.time() + 30
+    while len(received) < expected and time.time() < deadline:
+        time.sleep(0.01)
+    elapsed = time.perf_counter() - begin
+    server.Stop()
+    server.join(5)
+
+    ids = sorted(assets[0]["id"] for assets in received)
+    intact = all(len(assets[0]["padding"]) == size for assets in received)
+    lost = expected - len(received)
+    ok = not errors and lost == 0 and intact and len(set(ids)) == expected
+    mode = ("framed" if framed else "per connection") + (", streamed" if stream else "")
+    print("%-28s %4d senders %6d payloads %8.1f ms %8.1f payloads/s  %s" % (
+        mode, senders, expected, elapsed * 1000, expected / elapsed,
+        "OK" if ok else "FAILED (%d lost, %d send errors)" % (lost, len(errors))))
+    return ok
+
+
+def UnknownMessage(addon, timeout=5.0):
+    server = addon.ms_Init(lambda payload: None, 8192, None, False)
+    server.Bind(port=0)
+    port = server.socket_.getsockname()[1]
+    server.start()
+
+    client = LiveLinkClient(addon.MS_FramedProtocol, port=port, timeout=timeout)
+    begin = time.perf_counter()
+    try:
+        client.Send(b'', messageType=255)
+        error = None
+    except Exception as e:
+        error = e
+    elapsed = time.perf_counter() - begin
+    client.Close()
+    server.Stop()
+    server.join(5)
+
+    ok = isinstance(error, ConnectionError) and not isinstance(error, TimeoutError)
+    print("%-28s %8.1f ms  %s" % ("unknown message type", elapsed * 1000,
+                                  "OK" if ok else "FAILED (%s)" % (error or "acked")))
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--senders", type=int, default=50)
+    parser.add_argument("--payloads", type=int, default=4, help="Payloads sent by every sender")
+    parser.add_argument("--size", type=int, default=64 * 1024, help="Approximate payload size in bytes")
+    args = parser.parse_args()
+
+    addon = fake_bpy.install()
+    ok = True
+    for framed, stream in [(False, False), (False, True), (True, False)]:
+        ok = Run(addon, args.senders, args.payloads, args.size, framed, stream) and ok
+    ok = UnknownMessage(addon) and ok
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
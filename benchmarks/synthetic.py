@@ -0,0 +1,62 @@
+# Synthetic Bridge payloads for the benchmarks, made of real texture and mesh files so that
+# loading them costs as much I/O as real assets of the same size.
+
+import json
+import os
+import struct
+import zlib
+
+
+# Create a Bridge JSON payload of `assets` surfaces or 3d assets with `components` textures and
+# `lods` meshes each. The textures are PNG files of `textureSize` pixels filled with noise and
+# the meshes OBJ grids of `meshResolution` quads a side, halved for every LOD. They are written
+# to `directory` and kept for later runs with the same sizes.
+def synthetic_payload(directory, assets, components=8, lods=0, textureSize=512, meshResolution=256):
+    textureTypes = ["albedo", "ao", "roughness", "normal", "displacement", "specular", "metalness",
+                    "translucency", "opacity", "bump", "cavity", "curvature", "fuzz"]
+    colorTypes = ["albedo", "normal", "specular", "translucency"]
+    os.makedirs(directory, exist_ok=True)
+    assetList = []
+    for index in range(assets):
+        assetID = "bench%04d" % index
+        textures = []
+        for texType in textureTypes[:components]:
+            texPath = os.path.join(directory, "%s_%dpx_%s.png" % (assetID, textureSize, texType))
+            if not os.path.exists(texPath):
+                synthetic_texture(texPath, textureSize, 3 if texType in colorTypes else 1)
+            textures.append({"type": texType, "format": "png", "path": texPath})
+        meshes = []
+        for lod in range(lods):
+            meshPath = os.path.join(directory, "%s_%dq_LOD%d.obj" % (assetID, meshResolution, lod))
+            if not os.path.exists(meshPath):
+                synthetic_mesh(meshPath, max(1, meshResolution >> lod))
+            meshes.append({"format": "obj", "path": meshPath})
+        assetList.append({"type": "3d" if lods else "surface", "path": directory, "id": assetID,
+                          "name": "Benchmark Asset " + assetID, "category": "Ground",
+                          "categories": [], "tags": [], "activeLOD": "high", "minLOD": "lod%d" % lods,
+                          "components": textures, "meshList": meshes})
+    return json.dumps(assetList).encode()
+
+
+# Write an 8-bit grayscale or RGB PNG of random pixels, which doesn't compress, so reading it
+# costs as much I/O as a real texture of the same size.
+def synthetic_texture(path, size, channels):
+    rows = b"".join(b"\0" + os.urandom(size * channels) for row in range(size))
+    def chunk(tag, data):
+        return struct.pack("!I", len(data)) + tag + data + struct.pack("!I", zlib.crc32(tag + data))
+    header = struct.pack("!IIBBBBB", size, size, 8, 0 if channels == 1 else 2, 0, 0, 0)
+    with open(path, "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(rows, 1)) + chunk(b"IEND", b""))
+
+
+# Write an OBJ grid of resolution x resolution quads.
+def synthetic_mesh(path, resolution):
+    step = 1.0 / resolution
+    with open(path, "w") as f:
+        f.write("o %s\n" % os.path.splitext(os.path.basename(path))[0])
+        for y in range(resolution + 1):
+            f.write("".join("v %f %f 0\n" % (x * step, y * step) for x in range(resolution + 1)))
+        for y in range(resolution):
+            row = y * (resolution + 1) + 1
+            f.write("".join("f %d %d %d %d\n" % (row + x, row + x + 1, row + x + resolution + 2, row + x + resolution + 1)
+                            for x in range(resolution)))